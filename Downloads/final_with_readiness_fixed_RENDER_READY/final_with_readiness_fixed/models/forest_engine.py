@@ -0,0 +1,244 @@
+"""
+NumPy evaluator for the predictor pipelines (OneHotEncoder + passthrough -> RandomForestClassifier).
+
+export(pipelines) flattens fitted pipelines into a handful of contiguous arrays; CompiledModels
+scores frames with them and reproduces each pipeline's predict / predict_proba exactly:
+- inputs go through float32, as sklearn's trees see them, and each float64 split threshold is
+  rounded down to float32, which keeps `x <= threshold` unchanged for every float32 x;
+- per-tree leaf probabilities are summed tree by tree (cumsum), the order RandomForestClassifier
+  accumulates in, so even near-ties break the same way.
+save/load keep the arrays as .npy files that load memory-mapped: opening one is a few file maps,
+and every worker on the host scores from the same page-cache pages.
+"""
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+# Rows walked together; larger batches are scored in chunks of this many
+CHUNK_ROWS = 256
+# Arrays of an exported pipeline, stored one .npy each; the rest of export's dict goes to meta.json
+ARRAYS = ["feature", "threshold", "children", "proba", "roots"]
+# Bump when the array layout changes: older artifacts then fail to load and are re-exported
+FORMAT = 2
+
+
+def _round_down_f32(values) -> np.ndarray:
+    # Largest float32 <= each float64 value
+    out = np.asarray(values, dtype=np.float64).astype(np.float32)
+    over = out.astype(np.float64) > values
+    out[over] = np.nextafter(out[over], np.float32(-np.inf))
+    return out
+
+
+def input_spec(pipeline) -> tuple:
+    """(categorical columns, their categories as str arrays, passthrough columns) of a pipeline's "pre" step."""
+    categorical, numeric = [], []
+    encoder = None
+    for name, transformer, columns in pipeline.named_steps["pre"].transformers_:
+        if name == "remainder" or transformer == "drop":
+            continue
+        if transformer == "passthrough":
+            numeric.extend(columns)
+        else:
+            encoder = transformer
+            categorical.extend(columns)
+    categories = [np.asarray(c).astype(str) for c in (encoder.categories_ if encoder is not None else [])]
+    return list(categorical), categories, list(numeric)
+
+
+def same_inputs(a: tuple, b: tuple) -> bool:
+    """Whether two input_spec results encode frames identically."""
+    return (a[0] == b[0] and a[2] == b[2] and len(a[1]) == len(b[1])
+            and all(np.array_equal(x, y) for x, y in zip(a[1], b[1])))
+
+
+def export(pipelines: dict) -> dict:
+    """
+    Flatten fitted predictor pipelines (target name -> pipeline) that share one input encoding
+    into arrays, their trees back to back, so a single walk scores every target:
+    - feature/threshold: split of every node of every tree.
+    - children: two slots per node, [right, left]; slot 1 is taken when x <= threshold.
+      Leaves point at themselves, so a walk can run a fixed number of levels.
+    - proba: each node's normalized class distribution (only leaf rows are read), zero-padded
+      to the largest class count.
+    - roots: index of each tree's first node; tree_offsets: first tree of each target, then the total.
+    Node indices are int32, features int16 and thresholds float32; proba stays float64, which
+    exact agreement with sklearn needs. Raises ValueError if the pipelines encode inputs differently.
+    """
+    specs = {target: input_spec(p) for target, p in pipelines.items()}
+    spec = next(iter(specs.values()))
+    for target, other in specs.items():
+        if not same_inputs(spec, other):
+            raise ValueError(f"{target}: input encoding differs from the other targets; export it separately")
+    classifiers = [p.named_steps["clf"] for p in pipelines.values()]
+    trees = [(est.tree_, len(clf.classes_)) for clf in classifiers for est in clf.estimators_]
+    offsets = np.cumsum([0] + [t.node_count for t, _ in trees])
+    n_nodes, n_classes = int(offsets[-1]), max(len(clf.classes_) for clf in classifiers)
+    feature = np.zeros(n_nodes, dtype=np.int16)
+    threshold = np.full(n_nodes, np.float32(np.inf), dtype=np.float32)
+    children = np.empty(2 * n_nodes, dtype=np.int32)
+    proba = np.zeros((n_nodes, n_classes), dtype=np.float64)
+    for (tree, classes), start in zip(trees, offsets):
+        nodes = np.arange(tree.node_count) + start
+        leaf = tree.children_left == -1
+        feature[nodes] = np.where(leaf, 0, tree.feature)
+        threshold[nodes[~leaf]] = _round_down_f32(tree.threshold[~leaf])
+        children[2 * nodes] = np.where(leaf, nodes, tree.children_right + start)
+        children[2 * nodes + 1] = np.where(leaf, nodes, tree.children_left + start)
+        # DecisionTreeClassifier.predict_proba: value rows normalized to sum to 1
+        value = tree.value[:, 0, :classes]
+        normalizer = value.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        proba[nodes, :classes] = value / normalizer
+
+    return {
+        "feature": feature,
+        "threshold": threshold,
+        "children": children,
+        "proba": proba,
+        "roots": offsets[:-1].astype(np.int32),
+        "depth": max(t.max_depth for t, _ in trees),
+        "targets": list(pipelines),
+        "tree_offsets": np.cumsum([0] + [len(clf.estimators_) for clf in classifiers]).tolist(),
+        "classes": [np.asarray(clf.classes_).astype(str) for clf in classifiers],
+        "categorical": spec[0],
+        "categories": spec[1],
+        "numeric": spec[2],
+    }
+
+
+def save(arrays: dict, path: str) -> None:
+    """
+    Write an export to directory path: one .npy per array plus meta.json.
+    Written under a temporary name and renamed into place, so readers never see a partial one;
+    if path appears meanwhile (another worker exported the same models), that copy is kept.
+    """
+    tmp = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    try:
+        for name in ARRAYS:
+            np.save(os.path.join(tmp, name + ".npy"), np.ascontiguousarray(arrays[name]))
+        meta = {k: v for k, v in arrays.items() if k not in ARRAYS}
+        meta.update(format=FORMAT, classes=[[str(c) for c in classes] for classes in meta["classes"]],
+                    categories=[[str(c) for c in cats] for cats in meta["categories"]])
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        os.rename(tmp, path)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.isdir(path):
+            raise
+
+
+def load(path: str, mmap_mode: str = "r") -> dict:
+    """An export written by save, arrays memory-mapped read-only; raises OSError/ValueError if unusable."""
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("format") != FORMAT:
+        raise ValueError(f"{path}: artifact format {meta.get('format')}, expected {FORMAT}")
+    for name in ARRAYS:
+        meta[name] = np.load(os.path.join(path, name + ".npy"), mmap_mode=mmap_mode, allow_pickle=False)
+    return meta
+
+
+class CompiledModels:
+    """
+    Scores frames for every exported target at once (see export and load); no sklearn needed.
+    Inputs are encoded once and one walk covers all targets' trees. The arrays are
+    used as given, so memory-mapped ones stay shared rather than being copied into the process.
+    A batch walks every (row, tree) pair down one level per step, all pairs at once; once most
+    pairs have reached a leaf, the finished ones are dropped from the working set.
+    """
+
+    def __init__(self, arrays: dict):
+        # Plain ndarray views: same (possibly file-backed) buffers without np.memmap's per-op overhead
+        self._mapped_bytes = sum(arrays[k].nbytes for k in ARRAYS if isinstance(arrays[k], np.memmap))
+        self.feature = np.asarray(arrays["feature"])
+        self.threshold = np.asarray(arrays["threshold"])
+        self.children = np.asarray(arrays["children"])
+        self.proba = np.asarray(arrays["proba"])
+        self.roots = np.asarray(arrays["roots"])
+        self.depth = int(arrays["depth"])
+        self.targets = list(arrays["targets"])
+        self.tree_offsets = [int(t) for t in arrays["tree_offsets"]]
+        self.classes = {t: np.asarray(c, dtype=object) for t, c in zip(self.targets, arrays["classes"])}
+        self.categorical = list(arrays["categorical"])
+        self.categories = [np.asarray(c, dtype=object) for c in arrays["categories"]]
+        self.numeric = list(arrays["numeric"])
+        self.n_features = sum(len(c) for c in self.categories) + len(self.numeric)
+        self._codes = [{str(c): i for i, c in enumerate(cats)} for cats in self.categories]
+        self._is_leaf = self.children[1::2] == np.arange(len(self.feature))
+
+    def memory(self) -> dict:
+        """Bytes of model arrays: mapped (file-backed, shared between processes) and private."""
+        arrays = [self.feature, self.threshold, self.children, self.proba, self.roots, self._is_leaf]
+        return {"mapped_bytes": self._mapped_bytes, "private_bytes": sum(a.nbytes for a in arrays) - self._mapped_bytes}
+
+    def encode(self, df: pd.DataFrame) -> np.ndarray:
+        """Model input matrix (float32): one-hot categoricals (unknown values -> all zeros), then numerics."""
+        X = np.zeros((len(df), self.n_features), dtype=np.float32)
+        rows = np.arange(len(df))
+        at = 0
+        for col, lookup in zip(self.categorical, self._codes):
+            codes = np.fromiter((lookup.get(str(v), -1) for v in df[col].to_numpy()), dtype=np.intp, count=len(df))
+            known = codes >= 0
+            X[rows[known], at + codes[known]] = 1.0
+            at += len(lookup)
+        for col in self.numeric:
+            X[:, at] = df[col].to_numpy(dtype=np.float64)
+            at += 1
+        return X
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node reached in every tree, shape (rows, trees), for an encoded float32 matrix."""
+        n, n_trees = len(X), len(self.roots)
+        flat = np.ascontiguousarray(X, dtype=np.float32).ravel()
+        if n == 1:
+            node = self.roots.astype(np.intp)
+            for _ in range(self.depth):
+                node = self.children.take(2 * node + (flat.take(self.feature.take(node)) <= self.threshold.take(node)))
+            return node.reshape(1, n_trees)
+
+        node = np.tile(self.roots, n)
+        base = np.repeat(np.arange(n, dtype=np.intp) * X.shape[1], n_trees)
+        out, slot = None, None
+        for level in range(self.depth):
+            goes_left = np.take(flat, np.take(self.feature, node) + base) <= np.take(self.threshold, node)
+            node <<= 1
+            node += goes_left
+            node = np.take(self.children, node)
+            if level >= 5 and level % 3 == 2 and level < self.depth - 1:
+                active = ~np.take(self._is_leaf, node)
+                if active.mean() < 0.5:
+                    # Park finished pairs in out and keep walking the rest
+                    if out is None:
+                        out, slot = node.copy(), np.arange(n * n_trees)
+                    else:
+                        out[slot] = node
+                    node, base, slot = node[active], base[active], slot[active]
+        if out is None:
+            return node.reshape(n, n_trees)
+        out[slot] = node
+        return out.reshape(n, n_trees)
+
+    def predict_proba_encoded(self, X: np.ndarray) -> dict:
+        """target -> class probabilities (rows x that target's classes), as its pipeline's predict_proba."""
+        out = {t: np.empty((len(X), len(self.classes[t])), dtype=np.float64) for t in self.targets}
+        # Rows in chunks: keeps the per-(row, tree) working arrays cache-sized, so time grows linearly
+        for start in range(0, len(X), CHUNK_ROWS):
+            leaves = self.leaves(X[start:start + CHUNK_ROWS])
+            for t, lo, hi in zip(self.targets, self.tree_offsets, self.tree_offsets[1:]):
+                # Tree by tree, like RandomForestClassifier's accumulation, then averaged
+                summed = np.cumsum(self.proba[leaves[:, lo:hi]], axis=1)[:, -1] / (hi - lo)
+                out[t][start:start + CHUNK_ROWS] = summed[:, :len(self.classes[t])]
+        return out
+
+    def predict_proba(self, df: pd.DataFrame) -> dict:
+        return self.predict_proba_encoded(self.encode(df))
+
+    def predict(self, df: pd.DataFrame) -> dict:
+        """target -> predicted labels, as its pipeline's predict."""
+        return {t: self.classes[t].take(np.argmax(p, axis=1)) for t, p in self.predict_proba(df).items()}
@@ -1,8 +1,19 @@
 import joblib
+import glob
+import hashlib
 import os
+import shutil
+import threading
+import time
+from itertools import product
+import numpy as np
 import pandas as pd
+from forest_engine import CompiledModels, export, load, save
 
 MODELS_DIR = os.path.dirname(__file__)
+# Exported, memory-mappable copy of the models (see forest_engine.save); one directory per
+# set of model file versions, written on first use or ahead of time with `python models/predictor.py`
+ARTIFACTS_DIR = os.environ.get("MODEL_ARTIFACTS_DIR", os.path.join(MODELS_DIR, "compiled"))
 
 MODELS = {
     "mission_readiness": os.path.join(MODELS_DIR, "classifier_readiness.joblib"),
@@ -10,14 +21,177 @@ MODELS = {
     "leadership_potential": os.path.join(MODELS_DIR, "classifier_leadership.joblib"),
 }
 
+# Model inputs, in the order the pipelines were trained on
+FEATURES = ["role", "skills", "experience_years", "training_completed", "medical_score"]
+
+# Frames up to this many rows are scored by the NumPy evaluator (forest_engine), which has no
+# per-call overhead; sklearn's Cython tree walk is faster on bigger ones. Both give identical results.
+ENGINE_MAX_ROWS = 512
+
+# name -> (file stamp, fitted pipeline); reloaded when the file on disk changes
 _CACHED = {}
+# (file stamps, CompiledModels covering every target), loaded from its artifact when there is one
+_COMPILED = None
+# How the CompiledModels was last loaded (see model_stats)
+_LOADED = {}
+
+# Single-flight loading: one thread loads a model (or the compiled models) while the others
+# wait for its result instead of each unpickling the same file
+_LOCKS = {name: threading.Lock() for name in MODELS}
+_COMPILED_LOCK = threading.Lock()
+_WARMUP_LOCK = threading.Lock()
+_WARMUP = None
+# Predictor load state for readiness probes (see model_state)
+_STATE = {"state": "cold", "error": None, "since": time.time()}
+
+def _set_state(state, error=None):
+    _STATE.update(state=state, error=error, since=time.time())
+
+def _after_fork():
+    # A lock held by a loading thread stays held in a forked child, where that thread does not exist
+    global _LOCKS, _COMPILED_LOCK, _WARMUP_LOCK, _WARMUP
+    _LOCKS = {name: threading.Lock() for name in MODELS}
+    _COMPILED_LOCK, _WARMUP_LOCK, _WARMUP = threading.Lock(), threading.Lock(), None
+    if _STATE["state"] == "loading":
+        _set_state("cold")
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+def _stamp(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
 
 def _load(name):
-    if name not in _CACHED:
-        _CACHED[name] = joblib.load(MODELS[name])
-    return _CACHED[name]
+    stamp = _stamp(MODELS[name])
+    cached = _CACHED.get(name)
+    if cached is None or cached[0] != stamp:
+        with _LOCKS[name]:
+            cached = _CACHED.get(name)
+            if cached is None or cached[0] != stamp:
+                cached = _CACHED[name] = (stamp, joblib.load(MODELS[name]))
+    return cached[1]
+
+def _artifact_path(stamps):
+    version = "|".join("%d:%d" % stamp for stamp in stamps)
+    return os.path.join(ARTIFACTS_DIR, "predictor-" + hashlib.sha1(version.encode()).hexdigest()[:16])
+
+def _compiled():
+    global _COMPILED
+    current = _COMPILED
+    try:
+        stamps = tuple(_stamp(path) for path in MODELS.values())
+        if current is None or current[0] != stamps:
+            with _COMPILED_LOCK:
+                current = _COMPILED
+                if current is None or current[0] != stamps:
+                    _set_state("loading")
+                    current = _COMPILED = (stamps, _load_compiled(stamps))
+        if _STATE["state"] != "ready":
+            # Loaded now, or the files came back unchanged after a failed check
+            _set_state("ready")
+    except Exception as e:
+        _set_state("failed", f"{type(e).__name__}: {e}")
+        raise
+    return current[1]
+
+def _load_compiled(stamps):
+    # The artifact for these model files if present, else export the joblib pipelines and save one
+    started = time.perf_counter()
+    path = _artifact_path(stamps)
+    try:
+        arrays, source = load(path), "artifact"
+    except (OSError, ValueError):
+        arrays, source = export({name: _load(name) for name in MODELS}), "joblib"
+        try:
+            os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+            save(arrays, path)
+            _prune_artifacts(path)
+            arrays = load(path)
+        except (OSError, ValueError):
+            # Read-only deploy: keep scoring from the in-memory export
+            pass
+    compiled = CompiledModels(arrays)
+    _LOADED.clear()
+    _LOADED.update(source=source, path=path, load_ms=round((time.perf_counter() - started) * 1000, 2),
+                   **compiled.memory())
+    return compiled
+
+def _prune_artifacts(keep):
+    # Artifacts of replaced model files; workers still mapping them keep their pages until they reload
+    for path in glob.glob(os.path.join(ARTIFACTS_DIR, "predictor-*")):
+        if path != keep and ".tmp-" not in path:
+            shutil.rmtree(path, ignore_errors=True)
+
+def export_artifacts() -> dict:
+    """Write the artifact for the current model files (if missing) and load it; returns model_stats()."""
+    _compiled()
+    return model_stats()
+
+def warm_up(sklearn: bool = False, background: bool = False) -> dict:
+    """
+    Load the compiled models now instead of on the first prediction; with sklearn, also the
+    sklearn pipelines that frames over ENGINE_MAX_ROWS use. Errors are recorded in model_state().
+    background: run in a daemon thread (at most one at a time) and return immediately.
+    """
+    global _WARMUP
+    if background:
+        with _WARMUP_LOCK:
+            if _WARMUP is None or not _WARMUP.is_alive():
+                _WARMUP = threading.Thread(target=warm_up, kwargs={"sklearn": sklearn}, name="model-warmup", daemon=True)
+                _WARMUP.start()
+        return model_state()
+    try:
+        _compiled()
+        if sklearn:
+            for name in MODELS:
+                _load(name)
+    except Exception:
+        pass
+    return model_state()
+
+def model_state() -> dict:
+    """
+    Whether the predictor can serve: state is "cold" (nothing loaded yet), "loading", "ready" or
+    "failed" (error says why); since is when it entered that state. A replaced model file sends a
+    ready predictor back through loading on the next prediction.
+    """
+    return {**_STATE, "ready": _STATE["state"] == "ready", "sklearn_loaded": [name for name in MODELS if name in _CACHED]}
 
-def predict_all(role: str, skills: str, experience_years: int, training_completed: bool, medical_score: float):
+def _resident() -> dict:
+    # Process memory from /proc (Linux); empty elsewhere
+    try:
+        with open("/proc/self/statm") as f:
+            size, resident, shared = (int(v) for v in f.read().split()[:3])
+    except (OSError, ValueError):
+        return {}
+    page = os.sysconf("SC_PAGE_SIZE")
+    return {"rss_bytes": resident * page, "shared_bytes": shared * page}
+
+def model_stats() -> dict:
+    """
+    Where the compiled models came from ("artifact" = memory-mapped file, "joblib" = exported in
+    this process), load time and bytes mapped vs private; which sklearn pipelines are loaded
+    (only frames over ENGINE_MAX_ROWS need them); and this process's resident size.
+    """
+    return {
+        "artifacts_dir": ARTIFACTS_DIR,
+        "state": _STATE["state"],
+        "engine": dict(_LOADED) or {"source": None},
+        "sklearn_loaded": [name for name in MODELS if name in _CACHED],
+        "process": _resident(),
+    }
+
+def model_version() -> str:
+    """Identity of the model files on disk (size and mtime of each); changes when any is replaced."""
+    return "|".join("%d:%d" % _stamp(path) for path in MODELS.values())
+
+def predict_all(role: str, skills: str, experience_years: int, training_completed: bool, medical_score: float,
+                pool=None):
+    """
+    {target: label} for one person, plus "confidence": {target: probability of that label}.
+    pool: a PredictionPool (predict_pool.py) to score in a worker process instead of this one.
+    """
     df = pd.DataFrame([{
         "role": role,
         "skills": skills,
@@ -25,11 +199,112 @@ def predict_all(role: str, skills: str, experience_years: int, training_complete
         "training_completed": 1 if training_completed else 0,
         "medical_score": float(medical_score),
     }])
-    readiness = _load("mission_readiness").predict(df)[0]
-    performance = _load("performance_score").predict(df)[0]
-    leadership = _load("leadership_potential").predict(df)[0]
-    return {
-        "mission_readiness": str(readiness),
-        "performance_score": str(performance),
-        "leadership_potential": str(leadership),
-    }
\ No newline at end of file
+    return _predict_frame(df, pool)[0]
+
+def _truthy(s: pd.Series) -> pd.Series:
+    # training_completed as 0/1 from booleans, numbers or "yes"/"true"/"1" strings
+    if s.dtype == bool or s.dtype.kind in "iuf":
+        return (pd.to_numeric(s, errors="coerce").fillna(0) != 0).astype(int)
+    return s.astype(str).str.strip().str.lower().isin(["yes", "true", "1", "y"]).astype(int)
+
+def features_frame(rows) -> pd.DataFrame:
+    """
+    Model input frame for many people: a DataFrame or a list of dicts with the FEATURES keys.
+    Values are coerced the way predict_all coerces its arguments; raises ValueError on bad input.
+    """
+    df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame.from_records(list(rows))
+    missing = [c for c in FEATURES if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+    experience = pd.to_numeric(df["experience_years"], errors="coerce")
+    medical = pd.to_numeric(df["medical_score"], errors="coerce")
+    bad = experience.isna() | medical.isna()
+    if bad.any():
+        raise ValueError(f"Row {int(np.flatnonzero(bad.to_numpy())[0])}: experience_years and medical_score must be numbers.")
+    return pd.DataFrame({
+        "role": df["role"].astype(str).to_numpy(),
+        "skills": df["skills"].astype(str).to_numpy(),
+        "experience_years": experience.astype(int).to_numpy(),
+        "training_completed": _truthy(df["training_completed"]).to_numpy(),
+        "medical_score": medical.astype(float).to_numpy(),
+    })
+
+def proba_encoded(X: np.ndarray) -> dict:
+    """
+    target -> predict_proba for rows encoded by the compiled models (CompiledModels.encode): the
+    NumPy evaluator up to ENGINE_MAX_ROWS rows, sklearn's classifiers beyond. export checked that
+    the pipelines share one "pre" step, and encode builds the matrix that step would.
+    """
+    if len(X) <= ENGINE_MAX_ROWS:
+        return _compiled().predict_proba_encoded(X)
+    return {name: _load(name).named_steps["clf"].predict_proba(X) for name in MODELS}
+
+def _predict_frame(df: pd.DataFrame, pool=None) -> list:
+    # Every target over every row of a features_frame in one pass: labels (as each pipeline's
+    # predict) and, under "confidence", the probability the model gives each label
+    compiled = _compiled()
+    X = compiled.encode(df)
+    if pool is not None:
+        probas = pool.proba(X, {name: len(compiled.classes[name]) for name in compiled.targets})
+    else:
+        probas = proba_encoded(X)
+    labels, confidence = {}, {}
+    for name, proba in probas.items():
+        best = np.argmax(proba, axis=1)
+        labels[name] = compiled.classes[name].take(best).astype(str)
+        confidence[name] = np.round(proba[np.arange(len(best)), best], 4).tolist()
+    return [{**{name: labels[name][i] for name in probas},
+             "confidence": {name: confidence[name][i] for name in probas}} for i in range(len(df))]
+
+def predict_many(rows, cache=None, pool=None) -> list:
+    """
+    predict_all for many people at once: every model scored in one pass over all rows.
+    rows: a DataFrame or a list of dicts with the FEATURES keys; returns one dict per row, in order.
+    cache: a ResultCache memoizing predictions by normalized input tuple; it is emptied whenever
+    model_version() changes. Only distinct uncached inputs reach the models, and returned dicts
+    are shared with the cache, so treat them as read-only.
+    pool: a PredictionPool to score in worker processes (see predict_all).
+    """
+    df = features_frame(rows)
+    if df.empty:
+        return []
+    if cache is None:
+        return _predict_frame(df, pool)
+
+    version = model_version()
+    keys = list(zip(df["role"], df["skills"], df["experience_years"].tolist(),
+                    df["training_completed"].tolist(), df["medical_score"].tolist()))
+    out = [None] * len(keys)
+    todo = {}
+    for i, key in enumerate(keys):
+        found, value = cache.get(("predict", key, version))
+        if found:
+            out[i] = value
+        else:
+            todo.setdefault(key, []).append(i)
+    if todo:
+        preds = _predict_frame(df.iloc[[at[0] for at in todo.values()]], pool)
+        for (key, at), pred in zip(todo.items(), preds):
+            cache.put(("predict", key, version), pred)
+            for i in at:
+                out[i] = pred
+    return out
+
+def precompute_grid(cache, roles, skills, experience_years, medical_scores) -> int:
+    """
+    Fill cache with predictions for every combination of the given inputs (both training values),
+    so requests on that grid never reach sklearn. Returns the number of grid points.
+    """
+    grid = pd.DataFrame(
+        list(product(roles, skills, experience_years, [0, 1], medical_scores)),
+        columns=FEATURES,
+    )
+    version = model_version()
+    for key, pred in zip(grid.itertuples(index=False, name=None), _predict_frame(features_frame(grid))):
+        cache.put(("predict", key, version), pred)
+    return len(grid)
+
+if __name__ == "__main__":
+    # Build step: export every model to ARTIFACTS_DIR, so workers start by mapping files
+    import json
+    print(json.dumps(export_artifacts(), indent=2))
@@ -0,0 +1,50 @@
+import threading
+
+from utils.batching import MicroBatcher
+
+
+class Busy(RuntimeError):
+    pass
+
+
+def _call_together(batcher, items):
+    out = {}
+
+    def one(item):
+        try:
+            out[item] = batcher.call(item, timeout=5)
+        except Exception as e:
+            out[item] = e
+
+    threads = [threading.Thread(target=one, args=(item,)) for item in items]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return out
+
+
+def _batcher(calls):
+    def fn(items):
+        calls.append(len(items))
+        if "bad" in items:
+            raise ValueError("bad item")
+        if "busy" in items:
+            raise Busy("backend busy")
+        return [item.upper() for item in items]
+    return MicroBatcher(fn, window_ms=50)
+
+
+def test_bad_item_fails_only_its_caller():
+    calls = []
+    out = _call_together(_batcher(calls), ["a", "bad", "c"])
+    assert out["a"] == "A" and out["c"] == "C"
+    assert isinstance(out["bad"], ValueError)
+    assert calls == [3, 1, 1, 1]
+
+
+def test_backend_error_fails_the_whole_batch_without_retries():
+    calls = []
+    out = _call_together(_batcher(calls), ["a", "busy", "c"])
+    assert all(isinstance(e, Busy) for e in out.values())
+    assert calls == [3]
@@ -0,0 +1,34 @@
+import pytest
+
+from utils.intent import ROUTER
+
+
+@pytest.mark.parametrize("query, intent", [
+    ("retire people with training score below 50", "retirement"),
+    ("move pilots with training score below 40 to admin", "redeployment"),
+    ("ground people with training score below 30", "grounding"),
+    ("promote anyone with training score below 60", "promotion"),
+    ("budget for training score below 50", "budget"),
+])
+def test_training_clause_is_a_filter_on_the_action(query, intent):
+    route = ROUTER.route(query)
+    assert route["intent"] == intent
+    # The training clause is not applied as a filter, so the caller is told the query is mixed
+    assert route["ambiguous"]
+
+
+@pytest.mark.parametrize("query, intent", [
+    ("show training score below 60", "training"),
+    ("retire senior pilots", "retirement"),
+    ("team of 10 pilots", "team"),
+])
+def test_single_intent_queries_are_not_ambiguous(query, intent):
+    route = ROUTER.route(query)
+    assert route["intent"] == intent
+    assert not route["ambiguous"]
+
+
+def test_more_than_one_eligible_intent_is_ambiguous():
+    routes = ROUTER.route_many(["ground unfit pilots and build a team",
+                                "who needs training below 60 for leadership"])
+    assert [r["ambiguous"] for r in routes] == [True, True]
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pytest
+
+from utils.indexes import in_category
+from utils.logic import (PERFORMANCE_ORDER, add_derived_columns, build_derived_frame, leadership_list, load_df,
+                         what_if_simulation, who_needs_training)
+
+CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                   "data", "IAF_Human_Management_Synthetic_Dataset.csv")
+
+
+@pytest.fixture(scope="module")
+def roster():
+    df = load_df(CSV).copy()
+    df.loc[[3, 10, 50], "Training_Score"] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("thresh", [0, 60, 75])
+def test_training_list_keeps_missing_scores_last(roster, thresh):
+    # Missing scores count as 0 (as before the range index) but sort after every real score
+    indexed = who_needs_training(build_derived_frame(roster), thresh)
+    scanned = who_needs_training(roster, thresh)
+    assert list(indexed.index) == list(scanned.index)
+    expected = roster.index[roster["Training_Score"].fillna(0) < thresh]
+    assert sorted(indexed.index) == sorted(expected)
+    scores = indexed["Training_Score"]
+    missing = int(scores.isna().sum())
+    assert missing == (3 if thresh > 0 else 0)
+    assert scores.iloc[len(scores) - missing:].isna().all()
+    assert scores.iloc[:len(scores) - missing].is_monotonic_increasing
+
+
+@pytest.fixture(scope="module")
+def frames():
+    # The derived frame (ordered Performance_Rating) and the old string-typed one
+    raw = load_df(CSV)
+    d = add_derived_columns(raw)
+    return build_derived_frame(raw), d.assign(Performance_Rating=d["Performance_Rating"].astype(object))
+
+
+@pytest.mark.parametrize("ratings", [["Excellent", "Good"], ["Below Average", "Average"], ["Good"]])
+def test_rating_filters_match_string_filters(frames, ratings):
+    derived, strings = frames
+    assert list(in_category(derived, "Performance_Rating", ratings).positions()) == \
+        list(np.flatnonzero(strings["Performance_Rating"].isin(ratings)))
+    assert list(np.flatnonzero(derived["Performance_Rating"] == ratings[0])) == \
+        list(np.flatnonzero(strings["Performance_Rating"] == ratings[0]))
+
+
+def test_leadership_order_changes_only_within_score_ties(frames):
+    derived, strings = frames
+    new = leadership_list(derived)
+    old = strings.sort_values(["Leadership_Score", "Performance_Rating"], ascending=[False, False])
+    # Same people, same Leadership_Score sequence, same order among equal (score, rating) rows
+    assert sorted(new["Personnel_ID"]) == sorted(old["Personnel_ID"])
+    assert list(derived.loc[new.index, "Leadership_Score"]) == list(old["Leadership_Score"])
+    key = lambda f: [(s, str(r)) for s, r in zip(derived.loc[f.index, "Leadership_Score"], f["Performance_Rating"])]
+    for group in set(key(old)):
+        assert [p for p, k in zip(new["Personnel_ID"], key(new)) if k == group] == \
+            [p for p, k in zip(old["Personnel_ID"], key(old)) if k == group]
+    # The intended change: within a score, ratings go best first rather than alphabetically
+    merit = [(-s, -PERFORMANCE_ORDER.index(r)) for s, r in key(new)]
+    assert merit == sorted(merit)
+
+
+def test_promotion_candidates_match_string_filter(frames):
+    derived, strings = frames
+    result = what_if_simulation(derived, "promote high potential officers")
+    old = strings[strings["Leadership_Potential"].isin(["High", "Yes"])
+                  & strings["Performance_Rating"].isin(["Excellent", "Good"])
+                  & (strings["Years_of_Service"] >= 5)]
+    assert sorted(r["Personnel_ID"] for r in result["data"]) == sorted(old["Personnel_ID"])
+    assert {str(k): v for k, v in derived["Performance_Rating"].value_counts().items() if v} == \
+        strings["Performance_Rating"].value_counts().to_dict()
@@ -0,0 +1,71 @@
+import itertools
+import time
+
+import numpy as np
+import pytest
+
+from utils.team import TeamSolver
+
+SKILLS = ["Pilot", "Cybersecurity", "Engineer", "Admin"]
+RANKS = ["Pilot Officer", "Flying Officer", "Flight Lieutenant", "Squadron Leader", "Wing Commander"]
+
+
+def _roster(rng, n):
+    return (np.round(rng.random(n) * 10, 3), rng.choice(SKILLS, n), rng.choice(RANKS, n), rng.choice(SKILLS, n))
+
+
+def _brute_force(values, skills, ranks, secondary, headcount, skill_min, skill_max, rank_min, rank_max, cover_min):
+    best = None
+    for team in itertools.combinations(range(len(values)), headcount):
+        s = [skills[i] for i in team]
+        r = [ranks[i] for i in team]
+        if (all(s.count(k) >= v for k, v in skill_min.items()) and all(s.count(k) <= v for k, v in skill_max.items())
+                and all(r.count(k) >= v for k, v in rank_min.items()) and all(r.count(k) <= v for k, v in rank_max.items())
+                and all(sum(k in (skills[i], secondary[i]) for i in team) >= v for k, v in cover_min.items())):
+            value = float(values[list(team)].sum())
+            best = value if best is None else max(best, value)
+    return best
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    values, skills, ranks, secondary = _roster(rng, 11)
+    limits = dict(
+        skill_min={str(rng.choice(SKILLS)): int(rng.integers(1, 3))},
+        skill_max={str(rng.choice(SKILLS)): int(rng.integers(0, 2))},
+        rank_min={str(rng.choice(RANKS)): int(rng.integers(1, 3))},
+        rank_max={str(k): 1 for k in rng.choice(RANKS, 2, replace=False)},
+        cover_min={str(rng.choice(SKILLS)): int(rng.integers(1, 4))},
+    )
+    expected = _brute_force(values, skills, ranks, secondary, 4, **limits)
+    out = TeamSolver(values, skills, ranks, secondary, 4, **limits).solve(5.0)
+    if expected is None:
+        assert out["status"] == "infeasible" and len(out["positions"]) == 0
+    else:
+        assert out["status"] == "optimal"
+        assert out["objective"] == pytest.approx(expected)
+        assert float(values[out["positions"]].sum()) == pytest.approx(expected)
+
+
+def test_jointly_infeasible_is_proven_quickly():
+    # 10 Pilots/Cybersecurity wanted, but at most 1 per rank leaves room for only 5 people
+    values, skills, ranks, secondary = _roster(np.random.default_rng(0), 200)
+    started = time.perf_counter()
+    out = TeamSolver(values, skills, ranks, secondary, 10, skill_min={"Pilot": 6, "Cybersecurity": 4},
+                     rank_max={r: 1 for r in RANKS}).solve(0.3)
+    assert time.perf_counter() - started < 0.3
+    assert out["status"] == "infeasible"
+
+
+@pytest.mark.parametrize("budget", [0.0, 0.2])
+def test_search_stops_at_the_deadline(budget):
+    values, skills, ranks, secondary = _roster(np.random.default_rng(1), 5000)
+    started = time.perf_counter()
+    out = TeamSolver(values, skills, ranks, secondary, 25,
+                     skill_min={"Pilot": 5, "Engineer": 4}, skill_max={"Admin": 1, "Pilot": 8},
+                     rank_min={"Wing Commander": 3, "Squadron Leader": 4},
+                     rank_max={"Pilot Officer": 2, "Flying Officer": 3}, cover_min={"Cybersecurity": 6}).solve(budget)
+    assert time.perf_counter() - started < budget + 0.5
+    # The greedy seed gives a team even with no budget at all
+    assert out["status"] in ("feasible", "optimal") and len(out["positions"]) == 25
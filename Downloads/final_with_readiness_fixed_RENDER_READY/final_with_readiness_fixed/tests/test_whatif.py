@@ -0,0 +1,60 @@
+import os
+
+import pandas as pd
+import pytest
+
+from utils.intent import Vocabulary
+from utils.logic import _unfit_rows, add_derived_columns, load_df, scenario_chain
+from utils.scenario import Scenario
+
+CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                   "data", "IAF_Human_Management_Synthetic_Dataset.csv")
+
+
+@pytest.fixture(scope="module")
+def df():
+    return load_df(CSV)
+
+
+def test_skills_match_whole_words():
+    vocab = Vocabulary(pd.DataFrame({"Primary_Skill": ["Medical", "Engineer", "Radar Operator"],
+                                     "Rank": ["Flight Lieutenant"] * 3}))
+    assert vocab.skills_in("ground medically unfit engineers") == ["Engineer"]
+    assert vocab.skills_in("move radar operators to medical") == ["Medical", "Radar Operator"]
+    assert vocab.ranks_in("promote flight lieutenants") == ["Flight Lieutenant"]
+
+
+def _unfit(d):
+    # The grounding rule, spelled out: category C, or strictly out of the score/BMI bounds
+    return (d["Medical_Category"].isin(["C1", "C2"]) | (d["Medical_Score"] < 70)
+            | (d["BMI"] > 30) | (d["BMI"] < 18.5))
+
+
+def test_unfit_bounds_are_strict():
+    frame = pd.DataFrame({
+        "Medical_Category": ["A1", "A1", "A1", "A1", "A1", "A1", "C1"],
+        "Medical_Score": [70.0, 69.9, 80.0, 80.0, 80.0, 80.0, 80.0],
+        "BMI": [25.0, 25.0, 18.5, 18.4, 30.0, 30.1, 25.0],
+    })
+    assert list(_unfit_rows(Scenario(frame)).mask()) == [False, True, False, True, False, True, True]
+    assert list(_unfit(frame)) == [False, True, False, True, False, True, True]
+
+
+def test_grounding_names_only_engineers(df):
+    # "medically" must not pull every unfit Medical specialist into the step; engineers sitting
+    # exactly on a BMI bound stay fit
+    df = df.copy()
+    fit = df.index[(df["Primary_Skill"] == "Engineer") & ~_unfit(add_derived_columns(df))]
+    df.loc[fit[0], "BMI"] = 18.5
+    df.loc[fit[1], "BMI"] = 30.0
+    result = scenario_chain(df, ["ground medically unfit engineers"])
+    d = add_derived_columns(df)
+    assert result["steps"][0]["removed"] == int((_unfit(d) & (d["Primary_Skill"] == "Engineer")).sum()) == 4
+
+
+def test_chain_ending_in_team_step(df):
+    result = scenario_chain(df, ["retire senior pilots", "ground medically unfit engineers",
+                                 "build the best 20-person team"])
+    assert [step["removed"] for step in result["steps"]][1] == 4
+    assert len(result["data"]) == 20
+    assert "team of 20" in result["analysis"]
@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def version_of(df: pd.DataFrame):
+    # Set by load_df; frames built some other way fall back to their identity
+    return df.attrs.get("dataset_version") or f"id:{id(df)}"
+
+
+def _normalize(value):
+    # Make arguments hashable and order-insensitive where order carries no meaning
+    if isinstance(value, dict):
+        return tuple(sorted((k, _normalize(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(v) for v in value)
+    if isinstance(value, set):
+        return tuple(sorted(_normalize(v) for v in value))
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+class ResultCache:
+    """
+    In-process LRU memo for report results, keyed by (name, normalized args, dataset version).
+    - Holds at most max_entries results; the least recently used one is evicted first.
+    - The first lookup against a new dataset version drops every entry of older versions.
+    - Cached values are shared between requests, so callers must treat them as read-only.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def key(self, name: str, df: pd.DataFrame, **params):
+        return (name, _normalize(params), version_of(df))
+
+    def get(self, key):
+        with self._lock:
+            if key[-1] != self._version:
+                self._invalidate(key[-1])
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, self._data[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            if key[-1] != self._version:
+                self._invalidate(key[-1])
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, name: str, df: pd.DataFrame, fn, **params):
+        """Return the memoized fn(df, **params), computing and storing it on a miss."""
+        key = self.key(name, df, **params)
+        found, value = self.get(key)
+        if found:
+            return value
+        # Computed outside the lock; two concurrent misses just store the same answer twice
+        value = fn(df, **params)
+        self.put(key, value)
+        return value
+
+    def _invalidate(self, version) -> None:
+        if self._data:
+            self.invalidations += 1
+        self._data.clear()
+        self._version = version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "dataset_version": self._version,
+            }
@@ -0,0 +1,196 @@
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.cache import version_of
+
+# What-if intents as keyword groups: an intent is only eligible when every one of its
+# groups has a hit. Keywords match as substrings, like the old `word in text` chain,
+# and earlier intents win exact ties.
+INTENTS = [
+    ("retirement", [["retire", "retiring", "retirement"]]),
+    ("redeployment", [["redeploy", "redeployment", "transfer", "move"]]),
+    ("grounding", [["ground", "grounding", "medical", "unfit", "disqualify"]]),
+    ("promotion", [["promote", "promotion", "advance"]]),
+    ("budget", [["budget", "cost", "financial", "expense"]]),
+    ("training", [["training"], ["threshold", "score", "<", "less than", "below"]]),
+    ("leadership", [["leaders", "leadership"]]),
+    ("team", [["team", "readiness"]]),
+]
+# Intents that only narrow an action ("retire people with training score below 50" is a
+# retirement): each gives way to any of its listed intents that is also eligible
+FILTER_INTENTS = {"training": ["retirement", "redeployment", "grounding", "promotion", "budget"]}
+# Used when no intent is eligible
+DEFAULT_INTENT = "attrition"
+# Confidence below this (relative lead of the best intent over the runner-up) is flagged,
+# as is any query where more than one intent is eligible
+AMBIGUITY_MARGIN = 0.25
+
+
+class IntentRouter:
+    """
+    TF-IDF keyword router, built once.
+    - Features are keyword groups: synonyms collapse into one feature, so an intent with
+      many synonyms is not diluted, and term frequency is presence (0/1) so a repeated
+      word cannot outweigh a distinct one.
+    - weights: one L2-normalized, idf-weighted row per intent; a batch of queries becomes a
+      presence matrix and one matrix product gives every query/intent cosine.
+    - confidence = (best - runner-up) / best, so 1.0 means only one intent matched.
+    - filters: intent -> intents it gives way to (see FILTER_INTENTS).
+    """
+
+    def __init__(self, intents=INTENTS, default: str = DEFAULT_INTENT, margin: float = AMBIGUITY_MARGIN,
+                 filters=FILTER_INTENTS):
+        self.names = [name for name, _ in intents]
+        # yields[f, a]: intent f steps aside when intent a is eligible too
+        self.yields = np.zeros((len(intents), len(intents)))
+        for f, actions in (filters or {}).items():
+            self.yields[self.names.index(f), [self.names.index(a) for a in actions]] = 1.0
+        self.default = default
+        self.margin = margin
+        self.vocab = list(dict.fromkeys(kw for _, groups in intents for g in groups for kw in g))
+        col = {kw: j for j, kw in enumerate(self.vocab)}
+        self.features = [g for _, groups in intents for g in groups]
+
+        # keyword -> feature, and feature -> intent
+        self.keyword_feature = np.zeros((len(self.vocab), len(self.features)))
+        member = np.zeros((len(intents), len(self.features)))
+        f = 0
+        for i, (_, groups) in enumerate(intents):
+            for g in groups:
+                self.keyword_feature[[col[kw] for kw in g], f] = 1.0
+                member[i, f] = 1.0
+                f += 1
+        self.required = member.astype(bool)
+        self.idf = np.log(len(intents) / member.sum(axis=0)) + 1.0
+        w = member * self.idf
+        self.weights = w / np.linalg.norm(w, axis=1, keepdims=True)
+
+    def presence(self, texts) -> np.ndarray:
+        """Feature presence matrix (queries x keyword groups)."""
+        lows = [str(t).lower() for t in texts]
+        hits = np.array([[kw in t for kw in self.vocab] for t in lows], dtype=float).reshape(len(lows), len(self.vocab))
+        return np.minimum(hits @ self.keyword_feature, 1.0)
+
+    def _scores(self, texts):
+        # (scores, eligible): eligible intents before filter intents give way
+        tf = self.presence(texts)
+        q = tf * self.idf
+        norms = np.linalg.norm(q, axis=1, keepdims=True)
+        out = (q / np.where(norms == 0, 1.0, norms)) @ self.weights.T
+        # An intent is eligible only if the query hits every one of its groups
+        eligible = (tf @ self.required.T) == self.required.sum(axis=1)
+        yielded = (eligible @ self.yields.T) > 0
+        return np.where(eligible & ~yielded, out, 0.0), eligible
+
+    def scores(self, texts) -> np.ndarray:
+        """
+        Cosine similarity of each query to each intent; intents missing a group, or filter
+        intents giving way to an eligible action, score 0.
+        """
+        return self._scores(texts)[0]
+
+    def route_many(self, texts) -> list:
+        """One {intent, confidence, ambiguous, scores} dict per query."""
+        scores, eligible = self._scores(texts)
+        # Stable sort on the negated scores keeps INTENTS order among ties
+        order = np.argsort(-scores, axis=1, kind="stable")
+        routes = []
+        for row, rank, matched in zip(scores, order, eligible.sum(axis=1)):
+            best = row[rank[0]]
+            runner_up = row[rank[1]] if len(rank) > 1 else 0.0
+            if best <= 0:
+                intent, confidence = self.default, 0.0
+            else:
+                intent, confidence = self.names[rank[0]], float((best - runner_up) / best)
+            routes.append({
+                "intent": intent,
+                "confidence": round(confidence, 3),
+                "ambiguous": bool(confidence < self.margin or matched > 1),
+                "scores": {n: round(float(s), 3) for n, s in zip(self.names, row) if s > 0},
+            })
+        return routes
+
+    def route(self, text: str) -> dict:
+        return self.route_many([text])[0]
+
+
+class Vocabulary:
+    """Skill and rank names of one dataset, in order of first appearance, with lowercase forms."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.skills = self._values(df, "Primary_Skill")
+        self.ranks = self._values(df, "Rank")
+        self._skill_words = [self._word(s) for s in self.skills]
+        self._rank_words = [self._word(r) for r in self.ranks]
+
+    @staticmethod
+    def _values(df, col):
+        if col not in df.columns:
+            return []
+        return [str(v) for v in df[col].dropna().unique().tolist()]
+
+    @staticmethod
+    def _word(name: str):
+        # Whole words only, plurals allowed: "engineers" names Engineer, "medically" does not name Medical
+        return re.compile(r"\b" + re.escape(name.lower()) + r"(?:s|es)?\b")
+
+    def skill_positions(self, text_low: str) -> dict:
+        """skill -> where it is first named in text_low, for the skills it names."""
+        found = ((s, w.search(text_low)) for s, w in zip(self.skills, self._skill_words))
+        return {s: m.start() for s, m in found if m}
+
+    def skills_in(self, text_low: str) -> list:
+        return list(self.skill_positions(text_low))
+
+    def ranks_in(self, text_low: str) -> list:
+        return [r for r, w in zip(self.ranks, self._rank_words) if w.search(text_low)]
+
+
+ROUTER = IntentRouter()
+
+# ';' and "then" always separate chained what-if steps; "and" only between two steps
+_STEP_BREAK = re.compile(r"\s*;\s*|,?\s+(?:and\s+)?then\s+", re.IGNORECASE)
+_STEP_AND = re.compile(r",?\s+and\s+", re.IGNORECASE)
+
+
+def split_steps(text: str, chainable, router: IntentRouter = ROUTER) -> list:
+    """
+    Steps of a chained what-if, e.g. "retire senior pilots and ground unfit engineers, then
+    build the best 20-person team" -> three steps. A single query comes back as [text].
+    "and" splits only when every piece routes to a chainable intent, so "team with pilot
+    and engineer" stays one step.
+    """
+    steps = []
+    for part in _STEP_BREAK.split(text):
+        part = part.strip()
+        if not part:
+            continue
+        pieces = _STEP_AND.split(part)
+        if len(pieces) > 1 and all(r["intent"] in chainable for r in router.route_many(pieces)):
+            steps.extend(p.strip() for p in pieces)
+        else:
+            steps.append(part)
+    return steps or [text]
+
+# dataset version -> Vocabulary; only the newest few versions are kept
+_VOCABULARIES = {}
+_VOCAB_LOCK = threading.Lock()
+_VOCAB_KEEP = 4
+
+
+def vocabulary_for(df: pd.DataFrame) -> Vocabulary:
+    """Vocabulary of df, built once per dataset version."""
+    version = version_of(df)
+    vocab = _VOCABULARIES.get(version)
+    if vocab is None:
+        with _VOCAB_LOCK:
+            vocab = _VOCABULARIES.get(version)
+            if vocab is None:
+                vocab = Vocabulary(df)
+                _VOCABULARIES[version] = vocab
+                while len(_VOCABULARIES) > _VOCAB_KEEP:
+                    _VOCABULARIES.pop(next(iter(_VOCABULARIES)))
+    return vocab
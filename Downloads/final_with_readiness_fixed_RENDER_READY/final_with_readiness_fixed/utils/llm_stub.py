@@ -0,0 +1,61 @@
+"""
+Local stand-in for the OpenAI chat completions API, for development and tests.
+
+    python -m utils.llm_stub --port 8089 --delay 1.5
+    OPENAI_API_KEY=stub OPENAI_BASE_URL=http://127.0.0.1:8089/v1 python app.py
+
+Answers POST /v1/chat/completions with a canned narrative built from the request's last
+message, after --delay seconds (use a delay above NARRATIVE_TIMEOUT_S to exercise timeouts).
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(delay: float = 0.0):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            messages = body.get("messages") or [{}]
+            first_line = str(messages[-1].get("content", "")).splitlines()[:1]
+            time.sleep(delay)
+            payload = json.dumps({
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": f"[stub narrative] {' '.join(first_line)}"},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+def serve(port: int = 8089, delay: float = 0.0, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """The stub server, not yet serving: call serve_forever() (e.g. in a daemon thread)."""
+    return ThreadingHTTPServer((host, port), make_handler(delay))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--delay", type=float, default=0.0)
+    args = parser.parse_args()
+    print(f"LLM stub on http://127.0.0.1:{args.port}/v1 (delay {args.delay}s)")
+    serve(args.port, args.delay).serve_forever()
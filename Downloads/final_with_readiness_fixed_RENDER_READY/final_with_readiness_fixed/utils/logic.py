@@ -1,6 +1,17 @@
+import hashlib
+import os
+import re
+
 import pandas as pd
 import numpy as np
 
+from utils.indexes import all_rows, frame_extra, in_category, in_range, indexes_for
+from utils.intent import ROUTER, split_steps, vocabulary_for
+from utils.montecarlo import simulate
+from utils.ranking import take, top_k
+from utils.scenario import Scenario
+from utils.team import OVERALL_COLUMNS, TEAM_COLUMNS, TeamIndex, TeamSolver, overall_score
+
 MEDICAL_SCORE = {
     'A1': 100, 'A2': 95,
     'B1': 88,  'B2': 82,
@@ -9,60 +20,238 @@ MEDICAL_SCORE = {
 READINESS_SCORE = {'High': 3, 'Medium': 2, 'Low': 1}
 LEADERSHIP_MAP = {'High': 3, 'Medium': 2, 'Low': 1, 'Yes': 3, 'No': 1}
 ATTRITION_RISK_MAP = {'High': 3, 'Medium': 2, 'Low': 1}
+# Worst to best, so an ordered Performance_Rating sorts by merit rather than alphabetically
+PERFORMANCE_ORDER = ['Below Average', 'Average', 'Good', 'Excellent']
+
+DATE_COLUMNS = ["Last_Medical_Checkup", "Last_Mission_Date"]
+CATEGORICAL_COLUMNS = [
+    "Rank", "Primary_Skill", "Secondary_Skill", "Medical_Category", "Training_Course",
+    "Performance_Rating", "Performance_Feedback", "Readiness_Level", "Leadership_Potential",
+    "Attrition_Risk",
+]
+# Paginated report pages: columns shown, and the sort orders a user can pick
+# (name -> (columns, ascending)); the first order is the default
+MEDICAL_COLUMNS = ["Personnel_ID", "Name", "Rank", "Medical_Category", "Medical_Score", "BMI", "Last_Medical_Checkup"]
+TRAINING_COLUMNS = ["Personnel_ID", "Name", "Rank", "Training_Course", "Training_Score", "Performance_Rating"]
+LEADERSHIP_COLUMNS = ["Personnel_ID", "Name", "Rank", "Primary_Skill",
+                      "Leadership_Potential", "Performance_Rating", "Missions_Completed"]
+PAGE_SORTS = {
+    "medical": {
+        "id": (["Personnel_ID"], [True]),
+        "name": (["Name"], [True]),
+        "rank": (["Rank"], [True]),
+        "category": (["Medical_Category"], [True]),
+        "score": (["Medical_Score"], [False]),
+        "bmi": (["BMI"], [False]),
+    },
+    "leadership": {
+        "potential": (["Leadership_Score", "Performance_Score"], [False, False]),
+        "missions": (["Missions_Completed"], [False]),
+        "name": (["Name"], [True]),
+    },
+    "training": {
+        "score": (["Training_Score"], [True]),
+    },
+}
+# Rank ladder, junior first (promotion moves one step up)
+RANK_ORDER = ["Pilot Officer", "Flying Officer", "Flight Lieutenant", "Squadron Leader",
+              "Wing Commander", "Group Captain", "Air Commodore"]
+# What-if intents that change the roster and can be chained on a Scenario overlay
+SCENARIO_STEPS = ("retirement", "grounding", "redeployment", "promotion")
+# Bump whenever _parse_csv changes the typed layout, so old snapshots are ignored
+SNAPSHOT_FORMAT = 1
+
+# Numbers pulled out of what-if queries (training threshold, team size)
+_TWO_DIGITS = re.compile(r"(\d{2})")
+_NUMBER = re.compile(r"(\d{1,3})")
 
-def load_df(csv_path: str) -> pd.DataFrame:
+
+def _parse_csv(csv_path: str) -> pd.DataFrame:
     df = pd.read_csv(csv_path)
-    for col in ["Last_Medical_Checkup", "Last_Mission_Date"]:
+    for col in DATE_COLUMNS:
         if col in df.columns:
             df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
     return df
 
+def dataset_version(csv_path: str) -> str:
+    """Short key for a CSV built from its path, size, mtime and content hash."""
+    st = os.stat(csv_path)
+    content = hashlib.blake2b(digest_size=16)
+    with open(csv_path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            content.update(chunk)
+    key = f"{os.path.abspath(csv_path)}|{st.st_size}|{st.st_mtime_ns}|{content.hexdigest()}|{SNAPSHOT_FORMAT}"
+    return hashlib.blake2b(key.encode(), digest_size=12).hexdigest()
+
+def _snapshot_path(csv_path: str, snapshot_dir: str, version: str) -> str:
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(snapshot_dir, f"{stem}.{version}.arrow")
+
+def _read_snapshot(path: str):
+    try:
+        from pyarrow import feather
+    except ImportError:
+        return None
+    if not os.path.exists(path):
+        return None
+    try:
+        # Uncompressed Arrow IPC, so the columns are memory-mapped rather than parsed
+        return feather.read_table(path, memory_map=True).to_pandas()
+    except Exception:
+        return None
+
+def _write_snapshot(df: pd.DataFrame, path: str) -> None:
+    try:
+        from pyarrow import feather
+    except ImportError:
+        return
+    snapshot_dir = os.path.dirname(path)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        feather.write_feather(df, tmp, compression="uncompressed")
+        # Atomic swap: concurrent workers either see the whole file or none of it
+        os.replace(tmp, path)
+        # Drop snapshots of older versions of the same CSV: names are <csv stem>.<version>.arrow,
+        # and the stem itself may contain dots, so compare it whole
+        stem = os.path.basename(path).rsplit(".", 2)[0]
+        for name in os.listdir(snapshot_dir):
+            if (name.endswith(".arrow") and name != os.path.basename(path)
+                    and name.rsplit(".", 2)[0] == stem):
+                os.remove(os.path.join(snapshot_dir, name))
+    except Exception:
+        # A read-only filesystem just means every load parses the CSV
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def load_df(csv_path: str, snapshot_dir: str = None) -> pd.DataFrame:
+    """
+    Load the roster with dates and categoricals already typed.
+    - The first load parses the CSV and writes an Arrow snapshot into snapshot_dir
+      (default: a .snapshots folder next to the CSV); later loads memory-map it.
+    - The snapshot is keyed by dataset_version(), so editing the CSV invalidates it.
+    - Without pyarrow installed this falls back to parsing the CSV every time.
+    """
+    version = dataset_version(csv_path)
+    if snapshot_dir is None:
+        snapshot_dir = os.path.join(os.path.dirname(os.path.abspath(csv_path)), ".snapshots")
+    path = _snapshot_path(csv_path, snapshot_dir, version)
+    df = _read_snapshot(path)
+    if df is None:
+        df = _parse_csv(csv_path)
+        _write_snapshot(df, path)
+    df.attrs["dataset_version"] = version
+    return df
+
+def _map_scores(s: pd.Series, mapping: dict, default) -> pd.Series:
+    # Categoricals are mapped once per category and expanded through the codes; the table takes
+    # the scores' own dtype, so integer scores stay integers
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        lut = np.array([mapping.get(c, default) for c in s.cat.categories] + [default])
+        return pd.Series(lut[s.cat.codes.to_numpy()], index=s.index)
+    return s.map(mapping).fillna(default)
+
 def add_derived_columns(df: pd.DataFrame) -> pd.DataFrame:
+    # A frame from build_derived_frame already carries the scores; share it instead of copying
+    if df.attrs.get("derived"):
+        return df
     df = df.copy()
-    df["Medical_Score"] = df["Medical_Category"].map(MEDICAL_SCORE).fillna(60)
-    df["Leadership_Score"] = df["Leadership_Potential"].map(LEADERSHIP_MAP).fillna(1)
-    df["Readiness_Score"] = df["Readiness_Level"].map(READINESS_SCORE).fillna(1)
+    df["Medical_Score"] = _map_scores(df["Medical_Category"], MEDICAL_SCORE, 60)
+    df["Leadership_Score"] = _map_scores(df["Leadership_Potential"], LEADERSHIP_MAP, 1)
+    df["Readiness_Score"] = _map_scores(df["Readiness_Level"], READINESS_SCORE, 1)
     if "Attrition_Risk" in df.columns:
-        df["Attrition_Score"] = df["Attrition_Risk"].map(ATTRITION_RISK_MAP).fillna(2)
+        df["Attrition_Score"] = _map_scores(df["Attrition_Risk"], ATTRITION_RISK_MAP, 2)
     else:
         df["Attrition_Score"] = 2
     return df
 
-def who_is_going_to_leave(df: pd.DataFrame, top_n: int = 50) -> pd.DataFrame:
+def _read_only(values):
+    if isinstance(values, np.ndarray):
+        values = values.copy()
+        values.flags.writeable = False
+    return values
+
+def build_derived_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One-time, immutable version of the roster shared by every report function.
+    - Adds the score columns from add_derived_columns, so views never copy to re-map them.
+    - Performance_Rating becomes an ordered categorical (PERFORMANCE_ORDER) and
+      Performance_Score its 1-4 ordinal (0 when missing).
+    - Numpy-backed columns are read-only; views must project/filter, never assign.
+    """
+    d = add_derived_columns(df)
+    if "Performance_Rating" in d.columns:
+        extra = sorted(set(d["Performance_Rating"].dropna().astype(str)) - set(PERFORMANCE_ORDER))
+        order = extra + PERFORMANCE_ORDER
+        d["Performance_Rating"] = pd.Categorical(d["Performance_Rating"].astype(object), categories=order, ordered=True)
+        lut = np.array([0] + [PERFORMANCE_ORDER.index(c) + 1 if c in PERFORMANCE_ORDER else 0 for c in order])
+        d["Performance_Score"] = lut[d["Performance_Rating"].cat.codes.to_numpy() + 1]
+    # copy=False keeps one block per column, so the read-only arrays are the frame's storage
+    frozen = pd.DataFrame({c: _read_only(d[c].to_numpy()) if isinstance(d[c].dtype, np.dtype) and d[c].dtype.kind in "biufO" else d[c].array
+                           for c in d.columns}, index=d.index, copy=False)
+    frozen.attrs.update(df.attrs)
+    frozen.attrs["derived"] = True
+    return frozen
+
+def _value_counts(s: pd.Series) -> dict:
+    # Categorical value_counts also lists categories with no rows; keep only observed ones
+    vc = s.value_counts()
+    return vc[vc > 0].to_dict()
+
+def who_is_going_to_leave(df: pd.DataFrame, top_n: int = 50, offset: int = 0) -> pd.DataFrame:
     d = add_derived_columns(df)
     if "Attrition_Risk" in d.columns:
-        out = d.sort_values(["Attrition_Score", "Years_of_Service"], ascending=[False, True])
-        return out[["Personnel_ID", "Name", "Rank", "Years_of_Service", "Attrition_Risk", "Performance_Rating"]].head(top_n)
+        pos = top_k(d, ["Attrition_Score", "Years_of_Service"], [False, True], k=top_n, offset=offset)
+        return take(d, pos, ["Personnel_ID", "Name", "Rank", "Years_of_Service", "Attrition_Risk", "Performance_Rating"])
     score = (
         (d["Years_of_Service"].fillna(0) > 20).astype(int)
         + (d["Performance_Rating"].fillna(3) <= 2).astype(int)
         + (d["Training_Score"].fillna(60) < 50).astype(int)
     )
-    d["Heuristic_Attrition"] = np.where(score >= 2, "High", np.where(score==1, "Medium", "Low"))
-    out = d.sort_values(["Heuristic_Attrition", "Years_of_Service"], ascending=[False, True])
-    return out[["Personnel_ID", "Name", "Rank", "Years_of_Service", "Heuristic_Attrition", "Performance_Rating"]].head(top_n)
+    heuristic = pd.Series(np.where(score >= 2, "High", np.where(score==1, "Medium", "Low")), index=d.index)
+    pos = top_k(d, [heuristic, "Years_of_Service"], [False, True], k=top_n, offset=offset)
+    out = take(d, pos, ["Personnel_ID", "Name", "Rank", "Years_of_Service", "Performance_Rating"])
+    out.insert(4, "Heuristic_Attrition", heuristic.to_numpy()[pos])
+    return out
 
 def medical_scores(df: pd.DataFrame) -> pd.DataFrame:
     d = add_derived_columns(df)
-    return d[["Personnel_ID", "Name", "Rank", "Medical_Category", "Medical_Score", "BMI", "Last_Medical_Checkup"]]
+    return d[MEDICAL_COLUMNS]
 
 def who_needs_training(df: pd.DataFrame, thresh: int = 60) -> pd.DataFrame:
     d = add_derived_columns(df)
-    need = d[d["Training_Score"].fillna(0) < thresh]
-    return need[["Personnel_ID", "Name", "Rank", "Training_Course", "Training_Score", "Performance_Rating"]].sort_values("Training_Score")
-
-def leadership_list(df: pd.DataFrame) -> pd.DataFrame:
+    idx = indexes_for(d)
+    if idx is not None and "Training_Score" in idx.ranges:
+        # Range index rows come back already ordered by score. A missing score counts as 0
+        # but sorts last, as in the scan below
+        scores = idx.ranges["Training_Score"]
+        pos = scores.lt(thresh)
+        if thresh > 0:
+            pos = np.concatenate([pos, scores.missing])
+        return take(d, pos, TRAINING_COLUMNS)
+    need = d.loc[d["Training_Score"].fillna(0) < thresh, TRAINING_COLUMNS]
+    return need.sort_values("Training_Score", kind="stable")
+
+def leadership_list(df: pd.DataFrame, top_n: int = None, offset: int = 0) -> pd.DataFrame:
+    if isinstance(df, Scenario):
+        # Read through the overlay: rows off the roster sort last and are cut
+        keep = df.keep.mask()
+        by = [df.column("Leadership_Score").where(keep), df.column("Performance_Rating")]
+        pos = top_k(df.base, by, [False, False], k=top_n, offset=offset)
+        return df.take(pos[keep[pos]], [c for c in LEADERSHIP_COLUMNS if c in df.base.columns])
     d = add_derived_columns(df)
-    cols = ["Personnel_ID","Name","Rank","Primary_Skill",
-            "Leadership_Potential","Performance_Rating","Missions_Completed"]
-    cols = [c for c in cols if c in d.columns]
-    return d.sort_values(["Leadership_Score", "Performance_Rating"], ascending=[False, False])[cols]
+    cols = [c for c in LEADERSHIP_COLUMNS if c in d.columns]
+    pos = top_k(d, ["Leadership_Score", "Performance_Rating"], [False, False], k=top_n, offset=offset)
+    return take(d, pos, cols)
 
 
 def skill_grouping(df: pd.DataFrame) -> dict:
     groups = {}
     if "Primary_Skill" in df.columns:
-        for skill, g in df.groupby("Primary_Skill"):
+        for skill, g in df.groupby("Primary_Skill", observed=True):
             groups[skill] = g[["Personnel_ID", "Name", "Rank", "Performance_Rating", "Readiness_Level", "Medical_Category"]].to_dict(orient="records")
     return groups
 
@@ -73,140 +262,350 @@ def select_best_team(df: pd.DataFrame, headcount: int, required_roles=None, rest
     - restrict_to_roles=True means pick ONLY from those roles (fixes 'any skill shows same data')
     """
 
-    d = add_derived_columns(df).copy()
+    if isinstance(df, Scenario):
+        team_index = _scenario_team_index(df)
+        pos = team_index.select(headcount, required_roles, restrict_to_roles)
+        team = df.take(pos, [c for c in TEAM_COLUMNS if c in df.base.columns])
+        return team.assign(Overall=team_index.overall[pos])
 
-    # Safe numeric casts
-    for col in ["Performance_Rating", "Training_Score", "Missions_Completed"]:
-        if col in d.columns:
-            d[col] = pd.to_numeric(d[col], errors="coerce").fillna(0)
-        else:
-            d[col] = 0
-
-    # Derive mapped scores if not already present
-    if "Medical_Score" not in d.columns and "Medical_Category" in d.columns:
-        d["Medical_Score"] = d["Medical_Category"].map(MEDICAL_SCORE).fillna(0)
-    if "Readiness_Score" not in d.columns and "Readiness_Level" in d.columns:
-        d["Readiness_Score"] = d["Readiness_Level"].map(READINESS_SCORE).fillna(0)
-    if "Leadership_Score" not in d.columns and "Leadership_Potential" in d.columns:
-        d["Leadership_Score"] = d["Leadership_Potential"].map(LEADERSHIP_MAP).fillna(0)
-
-    # Normalize some pieces
-    denom_missions = float(max(d["Missions_Completed"].max(), 1))
-    perf_norm      = d["Performance_Rating"] / (5.0 if d["Performance_Rating"].max() <= 5 else max(d["Performance_Rating"].max(), 1))
-    train_norm     = d["Training_Score"] / 100.0
-    medical_norm   = d["Medical_Score"] / 100.0
-
-    # Weighted Overall score (tweakable weights)
-    d["Overall"] = (
-        2.5 * d["Readiness_Score"] +
-        1.5 * d["Leadership_Score"] +
-        1.2 * perf_norm +
-        1.0 * medical_norm +
-        0.6 * train_norm +
-        0.4 * (d["Missions_Completed"] / denom_missions)
-    )
+    d = add_derived_columns(df)
+    team_index = frame_extra(d, "team", TeamIndex)
+    pos = team_index.select(headcount, required_roles, restrict_to_roles)
+    team = take(d, pos, [c for c in TEAM_COLUMNS if c in d.columns])
+    return team.assign(Overall=team_index.overall[pos])
+
+def _scenario_team_index(sc: Scenario) -> TeamIndex:
+    # The base TeamIndex limited to the scenario's roster; rescored only if it patched a score input
+    team_index = frame_extra(sc.base, "team", TeamIndex)
+    overall = skills = None
+    if any(c in sc.patches for c in OVERALL_COLUMNS):
+        cols = {c: sc.column(c) for c in OVERALL_COLUMNS if c in sc.base.columns}
+        overall = overall_score(pd.DataFrame(cols)).to_numpy(dtype=float)
+    if "Primary_Skill" in sc.patches:
+        skills = sc.column("Primary_Skill").astype(object).to_numpy()
+    return team_index.restrict(sc.keep.mask(), overall, skills)
+
+def select_best_teams(df: pd.DataFrame, specs) -> list:
+    """
+    select_best_team for many specs at once, as lists of row dicts (one list per spec).
+    - specs: dicts with headcount, required_roles and restrict_to_roles (same meaning as above)
+    Scoring and per-skill orderings are shared, and all teams are materialized in a single take.
+    """
+    d = add_derived_columns(df)
+    team_index = frame_extra(d, "team", TeamIndex)
+    picks = [
+        team_index.select(s.get("headcount", 10), s.get("required_roles"), s.get("restrict_to_roles", False))
+        for s in specs
+    ]
+    pos = np.concatenate(picks + [np.empty(0, dtype=np.intp)])
+    rows = take(d, pos, [c for c in TEAM_COLUMNS if c in d.columns]).assign(Overall=team_index.overall[pos])
+    rows = rows.to_dict(orient="records")
+    bounds = np.cumsum([0] + [len(p) for p in picks])
+    return [rows[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+def optimize_team(df: pd.DataFrame, headcount: int, skill_min=None, skill_max=None,
+                  min_medical: str = None, min_readiness: str = None, rank_min=None, rank_max=None,
+                  cover=None, time_budget: float = 0.3) -> dict:
+    """
+    Highest total Overall team of exactly headcount people that satisfies every constraint.
+    - skill_min/skill_max, rank_min/rank_max: {label: count} on Primary_Skill / Rank
+    - min_medical: worst acceptable Medical_Category (e.g. 'B1' admits A1, A2, B1)
+    - min_readiness: worst acceptable Readiness_Level (e.g. 'Medium' admits High, Medium)
+    - cover: {skill: count} members with that skill as Primary_Skill or Secondary_Skill
+    - time_budget: seconds; past it the best team so far is returned with its optimality gap
+    """
+    d = add_derived_columns(df)
+    team_index = frame_extra(d, "team", TeamIndex)
+
+    eligible = all_rows(d)
+    if min_medical:
+        if min_medical not in MEDICAL_SCORE:
+            raise ValueError(f"Unknown medical category: {min_medical}")
+        eligible &= in_range(d, "Medical_Score", lo=MEDICAL_SCORE[min_medical])
+    if min_readiness:
+        if min_readiness not in READINESS_SCORE:
+            raise ValueError(f"Unknown readiness level: {min_readiness}")
+        floor = READINESS_SCORE[min_readiness]
+        eligible &= in_category(d, "Readiness_Level", [k for k, v in READINESS_SCORE.items() if v >= floor])
+    pos = eligible.positions()
+
+    col = lambda c: d[c].astype(object).to_numpy()[pos]
+    result = TeamSolver(
+        team_index.overall[pos], col("Primary_Skill"), col("Rank"), col("Secondary_Skill"), headcount,
+        skill_min=skill_min, skill_max=skill_max, rank_min=rank_min, rank_max=rank_max, cover_min=cover,
+    ).solve(time_budget)
+
+    chosen = pos[result.pop("positions")]
+    team = take(d, chosen, [c for c in TEAM_COLUMNS if c in d.columns])
+    result["team"] = team.assign(Overall=team_index.overall[chosen])
+    result["candidates"] = len(pos)
+    return result
+
+_LLM_CLIENT = {}
 
-    # If restricting, keep only the requested skills
-    if restrict_to_roles and required_roles:
-        d = d[d["Primary_Skill"].isin(required_roles)]
-
-    # If not restricting, make sure we at least take one per requested role (when provided)
-    picked_idx = []
-    if required_roles and not restrict_to_roles:
-        for role in required_roles:
-            sub = d[d["Primary_Skill"] == role]
-            if len(sub):
-                picked_idx.append(sub.sort_values("Overall", ascending=False).index[0])
-
-    # Fill any remaining slots purely by best Overall
-    remaining = headcount - len(picked_idx)
-    rest = d.drop(index=picked_idx).sort_values("Overall", ascending=False).head(max(0, remaining))
-    team = pd.concat([d.loc[picked_idx], rest]).sort_values("Overall", ascending=False).head(headcount)
-
-    cols = ["Personnel_ID","Name","Rank","Primary_Skill","Readiness_Level","Medical_Category",
-            "Leadership_Potential","Performance_Rating","Overall"]
-    # Only keep columns that exist
-    cols = [c for c in cols if c in team.columns] + ["Overall"]
-    cols = list(dict.fromkeys(cols))  # de-dupe while keeping order
-    return team[cols]
-
-def what_if_simulation(df: pd.DataFrame, text: str) -> dict:
+def llm_client():
+    """
+    OpenAI client for the configured key, created once; None without openai or a real key.
+    OPENAI_BASE_URL (read by the client) can point it at utils/llm_stub.py instead of the API.
+    """
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key or api_key == "your_openai_api_key_here":
+        return None
+    key = (api_key, os.environ.get("OPENAI_BASE_URL"))
+    if key not in _LLM_CLIENT:
+        try:
+            from openai import OpenAI
+            _LLM_CLIENT[key] = OpenAI(api_key=api_key, base_url=key[1] or None)
+        except Exception:
+            # OpenAI not installed (or unusable), continue without it
+            _LLM_CLIENT[key] = None
+    return _LLM_CLIENT[key]
+
+def what_if_simulation(df: pd.DataFrame, text: str, route: dict = None, cache=None) -> dict:
     """
     Enhanced NLP-powered what-if scenario analysis
     Handles complex queries about retiring officers, redeploying staff, grounding pilots, etc.
+    - route: a precomputed ROUTER.route(text) (e.g. from a batch); routed here otherwise
+    - chained queries ("retire senior pilots and ground unfit engineers, then a 20-person team")
+      run as steps on one Scenario overlay (see scenario_chain)
+    - cache: a ResultCache; phrasings that reduce to the same (scenario, parameters) key
+      (see _query_key) are then computed once per dataset version
     """
-    import re
-    import os
-    
-    text_low = text.lower()
-    result = {"query": text, "analysis": "", "recommendations": [], "data": []}
-    
-    # Initialize OpenAI client if API key is available
-    client = None
-    try:
-        from openai import OpenAI
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if api_key and api_key != "your_openai_api_key_here":
-            client = OpenAI(api_key=api_key)
-    except ImportError:
-        # OpenAI not installed, continue without it
-        client = None
-    except Exception:
-        client = None
-    
-    # Enhanced keyword-based analysis for complex scenarios
-    if any(word in text_low for word in ["retire", "retiring", "retirement"]):
-        result.update(_analyze_retirement_scenario(df, text_low, client))
-    elif any(word in text_low for word in ["redeploy", "redeployment", "transfer", "move"]):
-        result.update(_analyze_redeployment_scenario(df, text_low, client))
-    elif any(word in text_low for word in ["ground", "grounding", "medical", "unfit", "disqualify"]):
-        result.update(_analyze_grounding_scenario(df, text_low, client))
-    elif any(word in text_low for word in ["promote", "promotion", "advance"]):
-        result.update(_analyze_promotion_scenario(df, text_low, client))
-    elif any(word in text_low for word in ["budget", "cost", "financial", "expense"]):
-        result.update(_analyze_budget_scenario(df, text_low, client))
-    elif "training" in text_low and any(tok in text_low for tok in ["threshold", "score", "<", "less than", "below"]):
-        m = re.search(r"(\d{2})", text_low)
-        thresh = int(m.group(1)) if m else 60
-        result["action"] = f"show_training_below_{thresh}"
-        result["data"] = who_needs_training(df, thresh=thresh).to_dict(orient="records")
-        result["analysis"] = f"Personnel requiring training below {thresh}% threshold"
-        return result
-    elif "leaders" in text_low or "leadership" in text_low:
-        skill = None
-        for s in df["Primary_Skill"].dropna().unique().tolist():
-            if s.lower() in text_low:
-                skill = s
-                break
-        tab = leadership_list(df)
-        if skill:
-            tab = tab[tab["Primary_Skill"].str.lower() == skill.lower()]
-        result["action"] = "show_leadership"
-        result["data"] = tab.head(50).to_dict(orient="records")
-        result["analysis"] = f"Leadership candidates{' for ' + skill if skill else ''}"
-        return result
-    elif "team" in text_low or "readiness" in text_low:
-        m = re.search(r"(\d{1,3})", text_low)
-        n = int(m.group(1)) if m else 10
-        roles = []
-        for s in df["Primary_Skill"].dropna().unique():
-            if s.lower() in text_low:
-                roles.append(s)
-        team = select_best_team(df, headcount=n, required_roles=roles or None)
-        result["action"] = "select_team"
-        result["data"] = team.to_dict(orient="records")
-        result["analysis"] = f"Optimal team of {n} personnel{' with ' + ', '.join(roles) if roles else ''}"
-        return result
+    route = route or ROUTER.route(text)
+    key = _query_key(df, text, route)
+    shared = _shared_result(df, key, text, cache)
+    if key[0] == "chain":
+        return {"query": text, **shared}
+    result = {"query": text, "analysis": "", "recommendations": [], "data": [],
+              "intent": {k: route[k] for k in ("intent", "confidence", "ambiguous")}}
+    result.update(shared)
+    return result
+
+def what_if_batch(df: pd.DataFrame, texts, cache=None):
+    """
+    Many what-if queries in one pass, yielding (index, result) as each scenario group finishes.
+    - All queries are routed in one matrix product.
+    - Queries with the same _query_key form one group, computed once (or served from cache);
+      every member gets the same action/analysis/data.
+    Groups run in order of first appearance, so results are not in input order.
+    """
+    texts = [str(t) for t in texts]
+    routes = ROUTER.route_many(texts)
+    groups = {}
+    for i, (text, route) in enumerate(zip(texts, routes)):
+        groups.setdefault(_query_key(df, text, route), []).append(i)
+
+    for key, members in groups.items():
+        shared = _shared_result(df, key, texts[members[0]], cache)
+        for i in members:
+            if key[0] == "chain":
+                result = {"query": texts[i], **shared}
+            else:
+                result = {"query": texts[i], "analysis": "", "recommendations": [], "data": [],
+                          "intent": {k: routes[i][k] for k in ("intent", "confidence", "ambiguous")}}
+                result.update(shared)
+            yield i, result
+
+def _query_key(df: pd.DataFrame, text: str, route: dict):
+    # Canonical (scenario, parameters) of a routed query: a chain of normalized steps, else _scenario_key
+    steps = split_steps(text, SCENARIO_STEPS)
+    if len(steps) > 1:
+        return "chain", tuple(" ".join(step.lower().split()).rstrip("?.!") for step in steps)
+    return _scenario_key(df, route["intent"], text.lower())
+
+def _shared_result(df: pd.DataFrame, key, text: str, cache=None) -> dict:
+    """
+    The query-independent part of a what-if result (action/analysis/data) for key.
+    Served from cache when given; cached results are shared, so callers copy before changing them.
+    """
+    def compute(d, scenario, params):
+        if scenario == "chain":
+            return scenario_chain(d, list(params))
+        return _run_scenario(d, scenario, text.lower())
+
+    if cache is None:
+        return compute(df, *key)
+    return cache.get_or_compute("whatif", df, compute, scenario=key[0], params=key[1])
+
+def scenario_chain(df: pd.DataFrame, steps) -> dict:
+    """
+    Apply what-if steps in order to one copy-on-write Scenario overlay of df.
+    - retirement/grounding/redeployment/promotion steps change the roster (SCENARIO_STEPS)
+    - a team or leadership step reads through the result; otherwise the summary is the answer
+    e.g. ["retire senior pilots", "ground medically unfit engineers", "build the best 20-person team"]
+    """
+    sc = Scenario(add_derived_columns(df))
+    routes = ROUTER.route_many(steps)
+    final = None
+    for step, route in zip(steps, routes):
+        if route["intent"] in SCENARIO_STEPS:
+            sc = _apply_step(sc, route["intent"], step)
+        else:
+            final = (route["intent"], step)
+
+    summary = scenario_summary(sc)
+    analysis = "Scenario Analysis:\n"
+    for st in sc.describe_steps():
+        analysis += f"• {st['label']}: {st['removed']} off the roster, {st['changed']} changed\n"
+    analysis += f"• Remaining headcount: {summary['headcount']} of {len(sc.base)}\n"
+    result = {
+        "action": "scenario_chain",
+        "analysis": analysis,
+        "recommendations": [],
+        "steps": sc.describe_steps(),
+        "summary": summary,
+        "intent": {
+            "intent": "chain",
+            "confidence": min(r["confidence"] for r in routes),
+            "ambiguous": any(r["ambiguous"] for r in routes),
+        },
+    }
+    if final and final[0] in ("team", "leadership"):
+        read = _run_scenario(sc, final[0], final[1].lower())
+        result.update(data=read["data"], analysis=analysis + read["analysis"])
     else:
-        # Default to attrition analysis
-        result["action"] = "show_attrition"
-        result["data"] = who_is_going_to_leave(df).to_dict(orient="records")
-        result["analysis"] = "Personnel at risk of leaving the organization"
-    
+        result["data"] = _scenario_changes(sc)
     return result
 
+def simulate_readiness(df: pd.DataFrame, trials: int = 10000, horizon: float = 1.0, team=None,
+                       steps=None, seed=None, chunk_bytes: int = 64 << 20) -> dict:
+    """
+    Monte Carlo attrition/downgrade outlook for the roster, optionally after what-if steps.
+    - steps: roster-changing what-if steps (SCENARIO_STEPS) applied first, as in scenario_chain;
+      other steps are ignored.
+    - team: {skill: count} requirement whose formability is reported.
+    """
+    sc = Scenario(add_derived_columns(df))
+    steps = list(steps or [])
+    for step, route in zip(steps, ROUTER.route_many(steps) if steps else []):
+        if route["intent"] in SCENARIO_STEPS:
+            sc = _apply_step(sc, route["intent"], step)
+    result = simulate(sc, trials=trials, horizon=horizon, team=team, seed=seed, chunk_bytes=chunk_bytes)
+    result["steps"] = sc.describe_steps()
+    return result
+
+def _apply_step(sc: Scenario, intent: str, step: str) -> Scenario:
+    # One roster-changing what-if step on top of sc
+    text_low = step.lower()
+    if intent == "retirement":
+        return sc.drop(_retirement_rows(sc, text_low), step)
+    if intent == "grounding":
+        # Grounds the skills named in the step (pilots when none is)
+        skills = vocabulary_for(sc.base).skills_in(text_low) or ["Pilot"]
+        return sc.drop(sc.in_category("Primary_Skill", skills) & _unfit_rows(sc), step)
+    if intent == "redeployment":
+        from_skill, to_skill = _redeployment_skills(sc.base, text_low)
+        rows = _redeployment_rows(sc, from_skill)
+        # Without a destination skill the people leave this roster
+        return sc.assign(rows, step, Primary_Skill=to_skill) if to_skill else sc.drop(rows, step)
+    if intent == "promotion":
+        up = {r: RANK_ORDER[i + 1] for i, r in enumerate(RANK_ORDER[:-1])}
+        return sc.assign(_promotion_rows(sc), step, Rank=lambda ranks: [up.get(r, r) for r in ranks])
+    return sc
+
+def scenario_summary(sc: Scenario) -> dict:
+    """Headline aggregates of a scenario's roster, read through the overlay."""
+    keep = sc.keep.mask()
+    return {
+        "headcount": int(keep.sum()),
+        "removed": int(len(keep) - keep.sum()),
+        "by_skill": sc.value_counts("Primary_Skill"),
+        "by_rank": sc.value_counts("Rank"),
+        "readiness": sc.value_counts("Readiness_Level"),
+        "avg_medical_score": round(float(sc.column("Medical_Score")[keep].mean()), 1) if keep.any() else 0.0,
+        "high_leadership": sc.in_category("Leadership_Potential", ["High", "Yes"]).count(),
+    }
+
+def _scenario_changes(sc: Scenario) -> list:
+    # Everyone a step removed or changed, labelled with that step
+    cols = ["Personnel_ID", "Name", "Rank", "Primary_Skill"]
+    rows = []
+    for step in sc.steps:
+        if step["removed"] is not None:
+            part = take(sc.base, step["removed"].positions(), cols).assign(Step=step["label"], Change="removed")
+        else:
+            part = sc.take(step["changed"].positions(), cols).assign(Step=step["label"], Change="changed")
+        rows.extend(part.to_dict(orient="records"))
+    return rows
+
+def _scenario_key(df: pd.DataFrame, intent: str, text_low: str):
+    # Everything the scenario reads from the query text; equal keys give equal results
+    if intent == "retirement":
+        return intent, tuple(w in text_low for w in ("senior", "high", "officer", "pilot", "engineer"))
+    if intent == "redeployment":
+        return intent, _redeployment_skills(df, text_low)
+    if intent == "training":
+        m = _TWO_DIGITS.search(text_low)
+        return intent, int(m.group(1)) if m else 60
+    if intent == "leadership":
+        skills = vocabulary_for(_frame(df)).skills_in(text_low)
+        return intent, skills[0] if skills else None
+    if intent == "team":
+        m = _NUMBER.search(text_low)
+        return intent, (int(m.group(1)) if m else 10, tuple(vocabulary_for(_frame(df)).skills_in(text_low)))
+    # grounding, promotion, budget and attrition do not depend on the wording
+    return intent, None
+
+def _run_scenario(df: pd.DataFrame, intent: str, text_low: str) -> dict:
+    """action/analysis/recommendations/data for one routed query."""
+    if intent == "retirement":
+        return _analyze_retirement_scenario(df, text_low)
+    if intent == "redeployment":
+        return _analyze_redeployment_scenario(df, text_low)
+    if intent == "grounding":
+        return _analyze_grounding_scenario(df, text_low)
+    if intent == "promotion":
+        return _analyze_promotion_scenario(df, text_low)
+    if intent == "budget":
+        return _analyze_budget_scenario(df, text_low)
+    if intent == "training":
+        _, thresh = _scenario_key(df, intent, text_low)
+        return {
+            "action": f"show_training_below_{thresh}",
+            "data": who_needs_training(df, thresh=thresh).to_dict(orient="records"),
+            "analysis": f"Personnel requiring training below {thresh}% threshold",
+        }
+    if intent == "leadership":
+        _, skill = _scenario_key(df, intent, text_low)
+        tab = leadership_list(df, top_n=None if skill else 50)
+        if skill:
+            tab = tab[tab["Primary_Skill"].str.lower() == skill.lower()]
+        return {
+            "action": "show_leadership",
+            "data": tab.head(50).to_dict(orient="records"),
+            "analysis": f"Leadership candidates{' for ' + skill if skill else ''}",
+        }
+    if intent == "team":
+        _, (n, roles) = _scenario_key(df, intent, text_low)
+        team = select_best_team(df, headcount=n, required_roles=list(roles) or None)
+        return {
+            "action": "select_team",
+            "data": team.to_dict(orient="records"),
+            "analysis": f"Optimal team of {n} personnel{' with ' + ', '.join(roles) if roles else ''}",
+        }
+    # Default to attrition analysis
+    return {
+        "action": "show_attrition",
+        "data": who_is_going_to_leave(df).to_dict(orient="records"),
+        "analysis": "Personnel at risk of leaving the organization",
+    }
+
+
+def _retirement_rows(sc: Scenario, text_low: str):
+    """Rows a retirement query targets, as a Bitmap over sc's roster."""
+    sel = sc.keep
+    if "senior" in text_low:
+        sel &= sc.in_range("Years_of_Service", lo=15)
+    if "officer" in text_low:
+        sel &= sc.in_category("Rank", contains="Officer|Captain|Major|Colonel")
+    if "pilot" in text_low:
+        sel &= sc.in_category("Primary_Skill", contains="Pilot")
+    if "engineer" in text_low:
+        sel &= sc.in_category("Primary_Skill", contains="Engineer")
+    return sel
 
-def _analyze_retirement_scenario(df: pd.DataFrame, text_low: str, client) -> dict:
+
+def _analyze_retirement_scenario(df: pd.DataFrame, text_low: str) -> dict:
     """Analyze impact of retiring officers/personnel"""
     d = add_derived_columns(df)
     
@@ -221,24 +620,17 @@ def _analyze_retirement_scenario(df: pd.DataFrame, text_low: str, client) -> dic
     if "engineer" in text_low:
         criteria.append("engineers")
     
-    # Find personnel matching criteria
-    retirement_candidates = d.copy()
-    if "senior" in text_low:
-        retirement_candidates = retirement_candidates[retirement_candidates["Years_of_Service"] >= 15]
-    if "officer" in text_low:
-        retirement_candidates = retirement_candidates[retirement_candidates["Rank"].str.contains("Officer|Captain|Major|Colonel", case=False, na=False)]
-    if "pilot" in text_low:
-        retirement_candidates = retirement_candidates[retirement_candidates["Primary_Skill"].str.contains("Pilot", case=False, na=False)]
-    if "engineer" in text_low:
-        retirement_candidates = retirement_candidates[retirement_candidates["Primary_Skill"].str.contains("Engineer", case=False, na=False)]
+    # Find personnel matching criteria (bitmaps ANDed together, no intermediate frames)
+    sel = _retirement_rows(Scenario(d), text_low)
+    retirement_candidates = take(d, sel.positions(), ["Personnel_ID", "Name", "Rank", "Primary_Skill", "Years_of_Service", "Performance_Rating", "Leadership_Potential"])
     
     # Calculate impact metrics
     total_affected = len(retirement_candidates)
     avg_experience = retirement_candidates["Years_of_Service"].mean() if total_affected > 0 else 0
     
     # Handle performance rating as text
-    performance_dist = retirement_candidates["Performance_Rating"].value_counts().to_dict() if total_affected > 0 else {}
-    leadership_loss = len(retirement_candidates[retirement_candidates["Leadership_Potential"].isin(["High", "Yes"])])
+    performance_dist = _value_counts(retirement_candidates["Performance_Rating"]) if total_affected > 0 else {}
+    leadership_loss = (sel & in_category(d, "Leadership_Potential", ["High", "Yes"])).count()
     
     # Generate analysis
     analysis = f"Retirement Impact Analysis:\n"
@@ -258,43 +650,55 @@ def _analyze_retirement_scenario(df: pd.DataFrame, text_low: str, client) -> dic
         "action": "retirement_impact",
         "analysis": analysis,
         "recommendations": recommendations,
-        "data": retirement_candidates[["Personnel_ID", "Name", "Rank", "Primary_Skill", "Years_of_Service", "Performance_Rating", "Leadership_Potential"]].to_dict(orient="records")
+        "data": retirement_candidates.to_dict(orient="records")
     }
 
 
-def _analyze_redeployment_scenario(df: pd.DataFrame, text_low: str, client) -> dict:
+def _frame(df):
+    # The base frame behind a Scenario overlay, or df itself
+    return df.base if isinstance(df, Scenario) else df
+
+
+def _redeployment_skills(df: pd.DataFrame, text_low: str):
+    """(from_skill, to_skill) named in a redeployment query; either may be None."""
+    from_skill = None
+    to_skill = None
+    for skill, at in vocabulary_for(df).skill_positions(text_low).items():
+        if "from" in text_low and at < text_low.find("from"):
+            from_skill = skill
+        elif "to" in text_low and at > text_low.find("to"):
+            to_skill = skill
+        elif not from_skill:
+            from_skill = skill
+        else:
+            to_skill = skill
+    return from_skill, to_skill
+
+
+def _redeployment_rows(sc: Scenario, from_skill: str = None):
+    """Rows a redeployment moves: the from_skill, else the weaker performers."""
+    if from_skill:
+        return sc.in_category("Primary_Skill", contains=from_skill)
+    # Handle text-based performance ratings
+    return sc.in_category("Performance_Rating", ["Below Average", "Average"])
+
+
+def _analyze_redeployment_scenario(df: pd.DataFrame, text_low: str) -> dict:
     """Analyze impact of redeploying/transferring personnel"""
     d = add_derived_columns(df)
     
     # Extract redeployment criteria
-    from_skill = None
-    to_skill = None
-    
-    skills = df["Primary_Skill"].dropna().unique()
-    for skill in skills:
-        if skill.lower() in text_low:
-            if "from" in text_low and text_low.find(skill.lower()) < text_low.find("from"):
-                from_skill = skill
-            elif "to" in text_low and text_low.find(skill.lower()) > text_low.find("to"):
-                to_skill = skill
-            elif not from_skill:
-                from_skill = skill
-            else:
-                to_skill = skill
+    from_skill, to_skill = _redeployment_skills(df, text_low)
     
     # Find personnel for redeployment
-    if from_skill:
-        redeploy_candidates = d[d["Primary_Skill"].str.contains(from_skill, case=False, na=False)]
-    else:
-        # Handle text-based performance ratings
-        redeploy_candidates = d[d["Performance_Rating"].isin(["Below Average", "Average"])]
+    sel = from_sel = _redeployment_rows(Scenario(d), from_skill)
+    redeploy_candidates = take(d, sel.positions(), ["Personnel_ID", "Name", "Rank", "Primary_Skill", "Performance_Rating", "Training_Score"])
     
     # Calculate impact
     total_affected = len(redeploy_candidates)
     skill_gaps = {}
     if from_skill:
-        remaining = d[~d["Primary_Skill"].str.contains(from_skill, case=False, na=False)]
-        skill_gaps[from_skill] = len(remaining[remaining["Primary_Skill"].str.contains(from_skill, case=False, na=False)])
+        skill_gaps[from_skill] = (~from_sel & from_sel).count()
     
     analysis = f"Redeployment Impact Analysis:\n"
     analysis += f"• {total_affected} personnel available for redeployment\n"
@@ -313,38 +717,45 @@ def _analyze_redeployment_scenario(df: pd.DataFrame, text_low: str, client) -> d
         "action": "redeployment_impact",
         "analysis": analysis,
         "recommendations": recommendations,
-        "data": redeploy_candidates[["Personnel_ID", "Name", "Rank", "Primary_Skill", "Performance_Rating", "Training_Score"]].to_dict(orient="records")
+        "data": redeploy_candidates.to_dict(orient="records")
     }
 
 
-def _analyze_grounding_scenario(df: pd.DataFrame, text_low: str, client) -> dict:
+def _unfit_rows(sc: Scenario):
+    """Rows medically unfit to fly/deploy: category C, low medical score or BMI out of range."""
+    return (
+        sc.in_category("Medical_Category", ["C1", "C2"]) |
+        sc.in_range("Medical_Score", hi=70) |
+        sc.in_range("BMI", lo=30, lo_inclusive=False) |
+        sc.in_range("BMI", hi=18.5)
+    )
+
+
+def _analyze_grounding_scenario(df: pd.DataFrame, text_low: str) -> dict:
     """Analyze impact of grounding pilots due to medical reasons"""
     d = add_derived_columns(df)
     
     # Find pilots with medical issues
-    pilots = d[d["Primary_Skill"].str.contains("Pilot", case=False, na=False)]
-    medical_issues = pilots[
-        (pilots["Medical_Category"].isin(["C1", "C2"])) |
-        (pilots["Medical_Score"] < 70) |
-        (pilots["BMI"] > 30) |
-        (pilots["BMI"] < 18.5)
-    ]
+    pilots = in_category(d, "Primary_Skill", contains="Pilot")
+    unfit = pilots & _unfit_rows(Scenario(d))
+    medical_issues = take(d, unfit.positions(), ["Personnel_ID", "Name", "Rank", "Medical_Category", "Medical_Score", "BMI", "Performance_Rating"])
     
     # Calculate impact
-    total_pilots = len(pilots)
+    total_pilots = pilots.count()
     grounded_pilots = len(medical_issues)
     operational_impact = (grounded_pilots / total_pilots * 100) if total_pilots > 0 else 0
     
     # Find replacement candidates - handle text-based performance ratings
-    replacement_candidates = pilots[
-        (pilots["Medical_Category"].isin(["A1", "A2", "B1"])) &
-        (pilots["Performance_Rating"].isin(["Excellent", "Good"])) &
-        (pilots["Training_Score"] >= 80)
-    ]
+    replacements = (
+        pilots &
+        in_category(d, "Medical_Category", ["A1", "A2", "B1"]) &
+        in_category(d, "Performance_Rating", ["Excellent", "Good"]) &
+        in_range(d, "Training_Score", lo=80)
+    ).count()
     
     analysis = f"Pilot Grounding Impact Analysis:\n"
     analysis += f"• {grounded_pilots} pilots would be grounded ({operational_impact:.1f}% of pilot force)\n"
-    analysis += f"• {len(replacement_candidates)} pilots available as replacements\n"
+    analysis += f"• {replacements} pilots available as replacements\n"
     analysis += f"• Operational readiness impact: {'High' if operational_impact > 20 else 'Medium' if operational_impact > 10 else 'Low'}\n"
     
     recommendations = [
@@ -358,24 +769,33 @@ def _analyze_grounding_scenario(df: pd.DataFrame, text_low: str, client) -> dict
         "action": "grounding_impact",
         "analysis": analysis,
         "recommendations": recommendations,
-        "data": medical_issues[["Personnel_ID", "Name", "Rank", "Medical_Category", "Medical_Score", "BMI", "Performance_Rating"]].to_dict(orient="records")
+        "data": medical_issues.to_dict(orient="records")
     }
 
 
-def _analyze_promotion_scenario(df: pd.DataFrame, text_low: str, client) -> dict:
+def _promotion_rows(sc: Scenario):
+    """Rows eligible for promotion: high leadership potential, good performance, 5+ years."""
+    return (
+        sc.in_category("Leadership_Potential", ["High", "Yes"]) &
+        sc.in_category("Performance_Rating", ["Excellent", "Good"]) &
+        sc.in_range("Years_of_Service", lo=5)
+    )
+
+
+def _analyze_promotion_scenario(df: pd.DataFrame, text_low: str) -> dict:
     """Analyze impact of promoting personnel"""
     d = add_derived_columns(df)
     
     # Find promotion candidates - handle text-based performance ratings
-    promotion_candidates = d[
-        (d["Leadership_Potential"].isin(["High", "Yes"])) &
-        (d["Performance_Rating"].isin(["Excellent", "Good"])) &
-        (d["Years_of_Service"] >= 5)
-    ].sort_values(["Leadership_Score", "Performance_Rating"], ascending=[False, False])
+    eligible = _promotion_rows(Scenario(d))
+    cols = ["Personnel_ID", "Name", "Rank", "Primary_Skill", "Leadership_Potential", "Performance_Rating", "Years_of_Service"]
+    pool = take(d, eligible.positions(), cols + ["Leadership_Score"])
+    pos = top_k(pool, ["Leadership_Score", "Performance_Rating"], [False, False])
+    promotion_candidates = take(pool, pos, cols)
     
     # Calculate impact
     total_candidates = len(promotion_candidates)
-    skill_distribution = promotion_candidates["Primary_Skill"].value_counts().to_dict()
+    skill_distribution = _value_counts(promotion_candidates["Primary_Skill"])
     
     analysis = f"Promotion Impact Analysis:\n"
     analysis += f"• {total_candidates} personnel eligible for promotion\n"
@@ -393,11 +813,11 @@ def _analyze_promotion_scenario(df: pd.DataFrame, text_low: str, client) -> dict
         "action": "promotion_impact",
         "analysis": analysis,
         "recommendations": recommendations,
-        "data": promotion_candidates[["Personnel_ID", "Name", "Rank", "Primary_Skill", "Leadership_Potential", "Performance_Rating", "Years_of_Service"]].to_dict(orient="records")
+        "data": promotion_candidates.to_dict(orient="records")
     }
 
 
-def _analyze_budget_scenario(df: pd.DataFrame, text_low: str, client) -> dict:
+def _analyze_budget_scenario(df: pd.DataFrame, text_low: str) -> dict:
     """Analyze budget/financial impact scenarios"""
     d = add_derived_columns(df)
     
@@ -407,11 +827,12 @@ def _analyze_budget_scenario(df: pd.DataFrame, text_low: str, client) -> dict:
     avg_medical_cost = d["Medical_Score"].mean() * 50     # Estimated medical cost
     
     # Find high-cost personnel - handle text-based performance ratings
-    high_cost_personnel = d[
-        (d["Training_Score"] > 80) |
-        (d["Medical_Score"] < 70) |
-        (d["Performance_Rating"].isin(["Below Average", "Average"]))
-    ]
+    high_cost = (
+        in_range(d, "Training_Score", lo=80, lo_inclusive=False) |
+        in_range(d, "Medical_Score", hi=70) |
+        in_category(d, "Performance_Rating", ["Below Average", "Average"])
+    )
+    high_cost_personnel = take(d, high_cost.positions(), ["Personnel_ID", "Name", "Rank", "Primary_Skill", "Training_Score", "Medical_Score", "Performance_Rating"])
     
     analysis = f"Budget Impact Analysis:\n"
     analysis += f"• Total personnel: {total_personnel}\n"
@@ -430,7 +851,7 @@ def _analyze_budget_scenario(df: pd.DataFrame, text_low: str, client) -> dict:
         "action": "budget_impact",
         "analysis": analysis,
         "recommendations": recommendations,
-        "data": high_cost_personnel[["Personnel_ID", "Name", "Rank", "Primary_Skill", "Training_Score", "Medical_Score", "Performance_Rating"]].to_dict(orient="records")
+        "data": high_cost_personnel.to_dict(orient="records")
     }
 
 
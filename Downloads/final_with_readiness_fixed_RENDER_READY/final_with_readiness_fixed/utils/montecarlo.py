@@ -0,0 +1,136 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.scenario import Scenario
+
+# Annual probability of leaving the service, by Attrition_Risk
+ATTRITION_RATE = {"High": 0.20, "Medium": 0.10, "Low": 0.04, "Yes": 0.20, "No": 0.04}
+DEFAULT_ATTRITION_RATE = 0.08
+# Retirement pressure: extra annual leaving probability per year served beyond this
+SERVICE_HAZARD_FROM = 20
+SERVICE_HAZARD_PER_YEAR = 0.015
+# Annual probability of a medical downgrade that makes someone non-deployable, by Medical_Category
+DOWNGRADE_RATE = {"A1": 0.02, "A2": 0.03, "B1": 0.05, "B2": 0.07, "C1": 0.10, "C2": 0.12}
+DEFAULT_DOWNGRADE_RATE = 0.05
+
+# Outcomes are drawn as 16-bit uniforms: probabilities resolve to 1/65536
+_SCALE = 1 << 16
+_MAX_P = 0.999
+
+
+def _columns(source, cols):
+    # Row-aligned numpy columns of a frame, or of the rows still on a Scenario's roster
+    if isinstance(source, Scenario):
+        pos = source.positions()
+        return {c: source.column(c).to_numpy()[pos] for c in cols}
+    return {c: source[c].to_numpy() for c in cols}
+
+
+def outcome_probabilities(source, horizon: float = 1.0):
+    """
+    Per-person (p_leave, p_downgrade) over horizon years, from Attrition_Risk,
+    Years_of_Service and Medical_Category. p_downgrade is conditional on staying.
+    """
+    cols = _columns(source, ["Attrition_Risk", "Years_of_Service", "Medical_Category"])
+    annual_leave = pd.Series(cols["Attrition_Risk"], dtype=object).map(ATTRITION_RATE).fillna(DEFAULT_ATTRITION_RATE).to_numpy(dtype=float)
+    service = pd.to_numeric(pd.Series(cols["Years_of_Service"]), errors="coerce").fillna(0).to_numpy(dtype=float)
+    annual_leave = annual_leave + SERVICE_HAZARD_PER_YEAR * np.maximum(service - SERVICE_HAZARD_FROM, 0)
+    annual_down = pd.Series(cols["Medical_Category"], dtype=object).map(DOWNGRADE_RATE).fillna(DEFAULT_DOWNGRADE_RATE).to_numpy(dtype=float)
+
+    horizon = max(float(horizon), 0.0)
+    p_leave = 1 - (1 - np.clip(annual_leave, 0, _MAX_P)) ** horizon
+    p_down = 1 - (1 - np.clip(annual_down, 0, _MAX_P)) ** horizon
+    return np.minimum(p_leave, _MAX_P), np.minimum(p_down, _MAX_P)
+
+
+def _dist(values) -> dict:
+    v = np.asarray(values, dtype=float)
+    p5, p50, p95 = np.percentile(v, [5, 50, 95])
+    return {
+        "mean": round(float(v.mean()), 2), "std": round(float(v.std()), 2),
+        "p5": float(p5), "p50": float(p50), "p95": float(p95),
+        "min": float(v.min()), "max": float(v.max()),
+    }
+
+
+def simulate(source, trials: int = 10000, horizon: float = 1.0, team=None, seed=None,
+             chunk_bytes: int = 64 << 20) -> dict:
+    """
+    Monte Carlo attrition and medical-downgrade outcomes for every person, trials times.
+    - source: the roster frame or a Scenario overlay (only rows still on it are simulated).
+    - Each person-trial is one 16-bit uniform u split into leave / downgrade / stay bands,
+      so a whole chunk of trials is a single compare against per-person thresholds.
+    - Deployable headcount per Primary_Skill = people who neither left nor were downgraded.
+    - team: {skill: count}; reports how often (and how many times over) it can still be formed,
+      the skill that most often blocks it, and required skills nobody has ("missing").
+    - chunk_bytes bounds the working set: trials run in chunks of ~chunk_bytes / (3 * n).
+    """
+    started = time.perf_counter()
+    trials = max(int(trials), 1)
+    p_leave, p_down = outcome_probabilities(source, horizon)
+    skills = pd.Series(_columns(source, ["Primary_Skill"])["Primary_Skill"], dtype=object).fillna("Unknown").to_numpy()
+    n = len(skills)
+
+    # Group people by skill so per-skill counts are sums over contiguous column slices
+    codes, names = pd.factorize(skills, sort=True)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+    t_leave = np.round(p_leave[order] * _SCALE).astype(np.uint16)
+    t_out = np.round((p_leave + (1 - p_leave) * p_down)[order] * _SCALE).astype(np.uint16)
+
+    rng = np.random.default_rng(seed)
+    chunk = max(1, min(trials, int(chunk_bytes) // max(3 * n, 1)))
+    deployable = np.empty((trials, len(names)), dtype=np.int32)
+    leavers = np.empty(trials, dtype=np.int32)
+    unavailable = np.empty(trials, dtype=np.int32)
+    for lo in range(0, trials, chunk):
+        m = min(chunk, trials - lo)
+        if n == 0:
+            deployable[lo:lo + m], leavers[lo:lo + m], unavailable[lo:lo + m] = 0, 0, 0
+            continue
+        raw = rng.bit_generator.random_raw((m * n + 3) // 4)
+        u = raw.view(np.uint16)[:m * n].reshape(m, n)
+        stay = u >= t_out
+        for j in range(len(names)):
+            deployable[lo:lo + m, j] = stay[:, bounds[j]:bounds[j + 1]].sum(axis=1, dtype=np.int32)
+        leavers[lo:lo + m] = (u < t_leave).sum(axis=1, dtype=np.int32)
+        unavailable[lo:lo + m] = n - deployable[lo:lo + m].sum(axis=1)
+
+    current = np.bincount(codes, minlength=len(names)) if n else np.zeros(len(names), dtype=np.int64)
+    result = {
+        "trials": trials,
+        "horizon_years": float(horizon),
+        "personnel": n,
+        "expected_leave_rate": round(float(p_leave.mean()), 4) if n else 0.0,
+        "attrition": _dist(leavers),
+        "downgrades": _dist(unavailable - leavers),
+        "deployable": _dist(n - unavailable),
+        "by_skill": {
+            str(name): {"current": int(current[j]), **_dist(deployable[:, j])}
+            for j, name in enumerate(names)
+        },
+    }
+    if team:
+        need = {str(k): int(v) for k, v in team.items() if int(v) > 0}
+        col = {str(name): j for j, name in enumerate(names)}
+        # Times over each requirement can be met; a skill nobody has caps it at 0
+        times = np.full(trials, np.iinfo(np.int32).max, dtype=np.int64)
+        for skill, count in need.items():
+            have = deployable[:, col[skill]] if skill in col else np.zeros(trials, dtype=np.int32)
+            times = np.minimum(times, have // count)
+        if not need:
+            times[:] = 0
+        present = [s for s in need if s in col]
+        result["team"] = {
+            "requirement": need,
+            "p_formable": round(float((times >= 1).mean()), 4),
+            "teams_formable": _dist(times),
+            # Required skills nobody on the roster has; the team can never be formed
+            "missing": [s for s in need if s not in col],
+            # Skill on the roster whose shortfall most often blocks the team
+            "bottleneck": min(present, key=lambda s: (deployable[:, col[s]] >= need[s]).mean()) if present else None,
+        }
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
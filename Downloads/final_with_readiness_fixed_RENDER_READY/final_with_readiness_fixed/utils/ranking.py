@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+
+def sort_key(values, ascending: bool = True) -> np.ndarray:
+    """
+    Float key where smaller sorts first, matching sort_values for that column.
+    - Categoricals sort by category order (ordered ones by merit, others alphabetically).
+    - Text is ranked alphabetically; datetimes by timestamp.
+    - Missing values always go last, as with sort_values(na_position="last").
+    """
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes = s.cat.codes.to_numpy()
+        key = codes.astype(float)
+        key[codes < 0] = np.nan
+    elif s.dtype.kind == "M":
+        key = s.to_numpy().view("i8").astype(float)
+        key[s.isna().to_numpy()] = np.nan
+    elif s.dtype.kind in "biuf":
+        key = s.to_numpy(dtype=float, na_value=np.nan)
+    else:
+        codes, _ = pd.factorize(s, sort=True)
+        key = codes.astype(float)
+        key[codes < 0] = np.nan
+    if not ascending:
+        key = -key
+    return np.where(np.isnan(key), np.inf, key)
+
+
+def top_k(df: pd.DataFrame, by, ascending=True, k: int = None, offset: int = 0) -> np.ndarray:
+    """
+    Row positions ranked [offset, offset + k) under a multi-key sort, without sorting everything.
+    - by: column names or Series aligned with df; ascending: bool or one bool per key.
+    - k=None returns every row from offset on.
+    - Ties keep their original row order, like the stable multi-key sort_values.
+    Costs O(n) per key to narrow down the rows that can still make the cut (each key only
+    partitions the rows still tied on the keys before it), plus an O(k log k) sort of those.
+    """
+    by = [by] if isinstance(by, (str, pd.Series)) else list(by)
+    if isinstance(ascending, bool):
+        ascending = [ascending] * len(by)
+    n = len(df)
+    offset = max(int(offset or 0), 0)
+    stop = n if k is None else min(n, offset + max(int(k), 0))
+    if offset >= stop:
+        return np.empty(0, dtype=np.intp)
+
+    cols = [df[c] if isinstance(c, str) else c for c in by]
+    cand = None
+    if stop < n:
+        # Rows beating the stop-th value on a key are in; only its ties go on to the next key,
+        # and ties left after the last key are broken by position (tied stays in row order).
+        # Each key is computed only for the rows still tied, so later keys touch few rows.
+        inside, tied, need = [], None, stop
+        for col, asc in zip(cols, ascending):
+            values = sort_key(_rows(col, tied), asc)
+            kth = np.partition(values, need - 1)[need - 1]
+            better = np.flatnonzero(values < kth)
+            same = np.flatnonzero(values == kth)
+            inside.append(better if tied is None else tied[better])
+            need -= len(better)
+            tied = same if tied is None else tied[same]
+            if need >= len(tied):
+                break
+        cand = np.concatenate(inside + [tied[:need]])
+    # np.lexsort treats its last key as primary; the position breaks remaining ties
+    cand_keys = [sort_key(_rows(col, cand), asc) for col, asc in zip(cols, ascending)]
+    if cand is None:
+        cand = np.arange(n)
+    order = np.lexsort([cand] + cand_keys[::-1])
+    return cand[order][offset:stop]
+
+
+def _rows(values, positions=None):
+    # values (Series or array) at positions, or all of them
+    if positions is None:
+        return values
+    if isinstance(values, pd.Series):
+        return values.iloc[positions]
+    return np.asarray(values)[positions]
+
+
+def take(df: pd.DataFrame, positions, columns) -> pd.DataFrame:
+    """Rows at positions, projected to columns, touching only those cells."""
+    return df.iloc[positions, df.columns.get_indexer(columns)]
@@ -0,0 +1,361 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+TEAM_COLUMNS = ["Personnel_ID", "Name", "Rank", "Primary_Skill", "Readiness_Level", "Medical_Category",
+                "Leadership_Potential", "Performance_Rating"]
+# Columns overall_score reads
+OVERALL_COLUMNS = ["Performance_Rating", "Training_Score", "Missions_Completed", "Medical_Score",
+                   "Readiness_Score", "Leadership_Score"]
+
+
+def overall_score(d: pd.DataFrame) -> pd.Series:
+    """Weighted 'Overall' team score for every row of a frame with the derived score columns."""
+    # Safe numeric casts (kept local: d may be the shared, read-only derived frame)
+    num = {}
+    for col in ["Performance_Rating", "Training_Score", "Missions_Completed"]:
+        if col in d.columns:
+            num[col] = pd.to_numeric(d[col], errors="coerce").fillna(0)
+        else:
+            num[col] = pd.Series(0, index=d.index)
+
+    # Normalize some pieces
+    denom_missions = float(max(num["Missions_Completed"].max(), 1))
+    perf_norm      = num["Performance_Rating"] / (5.0 if num["Performance_Rating"].max() <= 5 else max(num["Performance_Rating"].max(), 1))
+    train_norm     = num["Training_Score"] / 100.0
+    medical_norm   = d["Medical_Score"] / 100.0
+
+    # Weighted Overall score (tweakable weights)
+    return (
+        2.5 * d["Readiness_Score"] +
+        1.5 * d["Leadership_Score"] +
+        1.2 * perf_norm +
+        1.0 * medical_norm +
+        0.6 * train_norm +
+        0.4 * (num["Missions_Completed"] / denom_missions)
+    )
+
+
+class TeamIndex:
+    """
+    Overall scores plus presorted rankings, built once per dataset version.
+    - order: row positions by Overall, best first (ties in row order).
+    - by_skill: for each Primary_Skill, the ranks (indexes into order) of its rows, ascending.
+    A team query then touches only the top few ranks of each list it needs.
+    """
+
+    def __init__(self, d: pd.DataFrame = None, overall=None, skills=None, order=None):
+        if d is not None:
+            overall = overall_score(d).to_numpy(dtype=float)
+            skills = d["Primary_Skill"].astype(object).to_numpy()
+        self.overall = overall
+        self.skills = skills
+        self.order = np.argsort(-overall, kind="stable") if order is None else order
+        self.by_skill = {}
+        codes, uniques = pd.factorize(skills[self.order])
+        for i, skill in enumerate(uniques):
+            self.by_skill[skill] = np.flatnonzero(codes == i)
+
+    def restrict(self, allowed, overall=None, skills=None) -> "TeamIndex":
+        """
+        Same index limited to rows where allowed is True (e.g. a scenario overlay).
+        overall/skills replace the row scores or Primary_Skill values when a scenario changed them;
+        positions stay base-row positions either way.
+        """
+        allowed = np.asarray(allowed, dtype=bool)
+        rescored = overall is not None
+        overall = self.overall if overall is None else np.asarray(overall, dtype=float)
+        order = np.argsort(-overall, kind="stable") if rescored else self.order
+        return TeamIndex(overall=overall, skills=self.skills if skills is None else np.asarray(skills, dtype=object),
+                         order=order[allowed[order]])
+
+    def select(self, headcount: int, required_roles=None, restrict_to_roles: bool = False) -> np.ndarray:
+        """Row positions of the best team, best first (same rules as select_best_team)."""
+        headcount = max(int(headcount), 0)
+        roles = list(dict.fromkeys(required_roles or []))
+        empty = np.empty(0, dtype=np.intp)
+
+        if restrict_to_roles and roles:
+            # The best headcount among the roles come from the top headcount of each role's list
+            ranks = np.sort(np.concatenate([self.by_skill.get(r, empty)[:headcount] for r in roles] + [empty]))
+            return self.order[ranks[:headcount]]
+
+        # At least one per requested role, then fill purely by best Overall
+        picked = [int(self.by_skill[r][0]) for r in roles if len(self.by_skill.get(r, empty))]
+        taken = set(picked)
+        rest = [r for r in range(min(len(self.order), headcount + len(picked))) if r not in taken]
+        ranks = sorted(picked + rest[:max(0, headcount - len(picked))])[:headcount]
+        return self.order[np.asarray(ranks, dtype=np.intp)]
+
+
+
+def _max_flow(cap: list, source: int, sink: int) -> int:
+    # Edmonds-Karp on a small dense capacity matrix (lists, modified in place)
+    flow, n = 0, len(cap)
+    while True:
+        parent = [-1] * n
+        parent[source] = source
+        queue = [source]
+        for u in queue:
+            for v in range(n):
+                if parent[v] < 0 and cap[u][v] > 0:
+                    parent[v] = u
+                    queue.append(v)
+            if parent[sink] >= 0:
+                break
+        if parent[sink] < 0:
+            return flow
+        push, v = float("inf"), sink
+        while v != source:
+            push, v = min(push, cap[parent[v]][v]), parent[v]
+        v = sink
+        while v != source:
+            cap[parent[v]][v] -= push
+            cap[v][parent[v]] += push
+            v = parent[v]
+        flow += push
+
+
+def _assignable(pairs, total, s_lo, s_hi, r_lo, r_hi) -> bool:
+    """
+    Whether total people can be drawn with pairs[s, r] available per (skill, rank), between
+    s_lo and s_hi per skill and r_lo and r_hi per rank: a flow with lower bounds,
+    source -> skill -> rank -> sink, checked as a circulation.
+    """
+    m, p = pairs.shape
+    src, snk, s2, t2 = m + p, m + p + 1, m + p + 2, m + p + 3
+    cap = [[0] * (m + p + 4) for _ in range(m + p + 4)]
+    excess = [0] * (m + p + 4)
+
+    def edge(u, v, lo, hi):
+        cap[u][v] += int(hi) - int(lo)
+        excess[v] += int(lo)
+        excess[u] -= int(lo)
+
+    for s in range(m):
+        edge(src, s, s_lo[s], s_hi[s])
+        for r in range(p):
+            if pairs[s, r]:
+                edge(s, m + r, 0, pairs[s, r])
+    for r in range(p):
+        edge(m + r, snk, r_lo[r], r_hi[r])
+    edge(snk, src, total, total)
+    demand = 0
+    for v, e in enumerate(excess):
+        if e > 0:
+            cap[s2][v] += e
+            demand += e
+        elif e < 0:
+            cap[v][t2] -= e
+    return _max_flow(cap, s2, t2) == demand
+
+
+class TeamSolver:
+    """
+    Exact best-Overall team under mix constraints: branch-and-bound with a wall-clock budget.
+    - values/skills/ranks/secondary: one entry per eligible candidate.
+    - skill_min/skill_max, rank_min/rank_max: {label: count} limits on Primary_Skill / Rank.
+    - cover_min: {skill: count} members whose Primary_Skill or Secondary_Skill is that skill.
+    Candidates sharing (skill, rank, secondary) differ only in score, so the search decides how
+    many of each such type to take (always its best ones) instead of branching per person.
+    """
+
+    def __init__(self, values, skills, ranks, secondary, headcount: int,
+                 skill_min=None, skill_max=None, rank_min=None, rank_max=None, cover_min=None):
+        self.values = np.asarray(values, dtype=float)
+        self.headcount = n = max(int(headcount), 0)
+        skills, ranks, secondary = (np.asarray(a, dtype=object) for a in (skills, ranks, secondary))
+        skill_min, skill_max = skill_min or {}, skill_max or {}
+        rank_min, rank_max = rank_min or {}, rank_max or {}
+        cover_min = cover_min or {}
+
+        # Types, best first, so the first dive of the search is the greedy team
+        groups = {}
+        for pos in np.argsort(-self.values, kind="stable"):
+            groups.setdefault((skills[pos], ranks[pos], secondary[pos]), []).append(pos)
+        keys = list(groups)
+        self.members = [np.asarray(groups[k], dtype=np.intp) for k in keys]
+        self.prefix = [np.concatenate([[0.0], np.cumsum(self.values[m])]) for m in self.members]
+        self.sizes = np.array([len(m) for m in self.members], dtype=np.int64)
+
+        skill_labels = list(dict.fromkeys(list(skill_min) + list(skill_max) + [k[0] for k in keys]))
+        rank_labels = list(dict.fromkeys(list(rank_min) + list(rank_max) + [k[1] for k in keys]))
+        cover_labels = list(cover_min)
+        self.skill_of = np.array([skill_labels.index(k[0]) for k in keys], dtype=np.intp)
+        self.rank_of = np.array([rank_labels.index(k[1]) for k in keys], dtype=np.intp)
+        self.covers = np.array([[c in (k[0], k[2]) for c in cover_labels] for k in keys],
+                               dtype=np.int64).reshape(len(keys), len(cover_labels))
+
+        # Lower/upper count limits per label; "no limit" is anything above headcount
+        self.s_lo = np.array([skill_min.get(s, 0) for s in skill_labels], dtype=np.int64)
+        self.s_hi = np.array([min(skill_max.get(s, n), n) for s in skill_labels], dtype=np.int64)
+        self.r_lo = np.array([rank_min.get(r, 0) for r in rank_labels], dtype=np.int64)
+        self.r_hi = np.array([min(rank_max.get(r, n), n) for r in rank_labels], dtype=np.int64)
+        self.c_lo = np.array([cover_min[c] for c in cover_labels], dtype=np.int64)
+
+        # Suffix tables: how many of each label remain from type i onwards
+        self.s_avail = self._suffix(np.eye(len(skill_labels), dtype=np.int64)[self.skill_of] * self.sizes[:, None])
+        self.r_avail = self._suffix(np.eye(len(rank_labels), dtype=np.int64)[self.rank_of] * self.sizes[:, None])
+        self.c_avail = self._suffix(self.covers * self.sizes[:, None])
+        # ...and of each (skill, rank) pair, for the joint check in _feasible
+        pair = np.zeros((len(keys), len(skill_labels), len(rank_labels)), dtype=np.int64)
+        pair[np.arange(len(keys)), self.skill_of, self.rank_of] = self.sizes
+        self.sr_avail = self._suffix(pair.reshape(len(keys), -1)).reshape(len(keys) + 1, *pair.shape[1:])
+        self._joint = {}
+        # ...and the best n scores per skill remaining from type i onwards
+        self.best = [None] * (len(keys) + 1)
+        self.best[-1] = [np.empty(0)] * len(skill_labels)
+        for i in range(len(keys) - 1, -1, -1):
+            row, s = list(self.best[i + 1]), self.skill_of[i]
+            row[s] = -np.sort(-np.concatenate([row[s], self.values[self.members[i][:n]]]))[:n]
+            self.best[i] = row
+
+    @staticmethod
+    def _suffix(counts) -> np.ndarray:
+        out = np.zeros((len(counts) + 1, counts.shape[1]), dtype=np.int64)
+        out[:-1] = np.cumsum(counts[::-1], axis=0)[::-1]
+        return out
+
+    def _feasible(self, i, left, s_cnt, r_cnt, c_cnt) -> bool:
+        # Minimums still reachable with the types from i onwards and the open slots, label by label
+        s_need = np.maximum(self.s_lo - s_cnt, 0)
+        r_need = np.maximum(self.r_lo - r_cnt, 0)
+        c_need = np.maximum(self.c_lo - c_cnt, 0)
+        if ((s_need > self.s_avail[i]).any() or s_need.sum() > left
+                or (r_need > self.r_avail[i]).any() or r_need.sum() > left
+                or (c_need > self.c_avail[i]).any() or (c_need > left).any()):
+            return False
+        # ...and jointly: each open slot takes one skill and one rank, so the skill and rank
+        # limits together must admit left people from what remains
+        s_room = np.minimum(self.s_hi - s_cnt, left)
+        r_room = np.minimum(self.r_hi - r_cnt, left)
+        if (s_room < s_need).any() or (r_room < r_need).any():
+            return False
+        # With one side unconstrained, the other side's clipped capacities are the whole answer
+        if not r_need.any() and (r_room >= left).all():
+            return int(np.minimum(s_room, self.s_avail[i]).sum()) >= left
+        if not s_need.any() and (s_room >= left).all():
+            return int(np.minimum(r_room, self.r_avail[i]).sum()) >= left
+        key = (i, left, s_cnt.tobytes(), r_cnt.tobytes())
+        if key not in self._joint:
+            self._joint[key] = _assignable(self.sr_avail[i], left, s_need, s_room, r_need, r_room)
+        return self._joint[key]
+
+    def _greedy(self):
+        """
+        (value, pick) of a quick feasible team, or None: minimums first from the best types,
+        then the best remaining people under the maxima. Seeds solve() so every answer has a team.
+        """
+        n, T = self.headcount, len(self.members)
+        taken = np.zeros(T, dtype=np.int64)
+        s_cnt, r_cnt, c_cnt = np.zeros_like(self.s_lo), np.zeros_like(self.r_lo), np.zeros_like(self.c_lo)
+
+        def room(i):
+            s, r = self.skill_of[i], self.rank_of[i]
+            return int(min(self.sizes[i] - taken[i], self.s_hi[s] - s_cnt[s], self.r_hi[r] - r_cnt[r],
+                           n - taken.sum()))
+
+        def add(i, k):
+            taken[i] += k
+            s_cnt[self.skill_of[i]] += k
+            r_cnt[self.rank_of[i]] += k
+            c_cnt[:] += self.covers[i] * k
+
+        for lo, cnt, has in ((self.s_lo, s_cnt, lambda i, j: self.skill_of[i] == j),
+                             (self.r_lo, r_cnt, lambda i, j: self.rank_of[i] == j),
+                             (self.c_lo, c_cnt, lambda i, j: self.covers[i, j] > 0)):
+            for j in np.flatnonzero(lo):
+                for i in range(T):
+                    if cnt[j] >= lo[j]:
+                        break
+                    if has(i, j):
+                        add(i, max(min(room(i), int(lo[j] - cnt[j])), 0))
+        while taken.sum() < n:
+            heads = [self.values[self.members[i][taken[i]]] if room(i) > 0 else -np.inf for i in range(T)]
+            i = int(np.argmax(heads)) if heads else 0
+            if not heads or heads[i] == -np.inf:
+                return None
+            add(i, 1)
+        if (s_cnt < self.s_lo).any() or (r_cnt < self.r_lo).any() or (c_cnt < self.c_lo).any():
+            return None
+        pick = tuple((i, int(k)) for i, k in enumerate(taken) if k)
+        return sum(self.prefix[i][k] for i, k in pick), pick
+
+    def _bound(self, i, left, value, s_cnt):
+        # Relaxation: fill the open slots with the best remaining people under the skill maxima only
+        room = np.minimum(self.s_hi - s_cnt, left)
+        pool = np.concatenate([b[:max(int(c), 0)] for b, c in zip(self.best[i], room)] + [np.empty(0)])
+        if len(pool) < left:
+            return None
+        return value + (float(-np.partition(-pool, left - 1)[:left].sum()) if left else 0.0)
+
+    def solve(self, time_budget: float = 0.3) -> dict:
+        """
+        Best team found within time_budget seconds; the search always stops at the deadline.
+        - Seeded with a greedy team, so most feasible problems return a team even with no budget.
+        - status: optimal, feasible (budget ran out first), infeasible (proven), or timeout
+          (budget ran out before any team was found).
+        - bound: proven upper limit on the objective; gap = (bound - objective) / bound.
+        """
+        started = time.perf_counter()
+        deadline = started + max(float(time_budget), 0.0)
+        n, T = self.headcount, len(self.members)
+        best_value, best_pick, nodes = None, None, 0
+
+        zero = (np.zeros_like(self.s_lo), np.zeros_like(self.r_lo), np.zeros_like(self.c_lo))
+        root = self._bound(0, n, 0.0, zero[0]) if self._feasible(0, n, *zero) else None
+        if root is not None:
+            best_value, best_pick = self._greedy() or (None, None)
+        # Depth-first over (bound, type, open slots, value, skill/rank/cover counts, picks)
+        stack = [] if root is None else [(root, 0, n, 0.0, *zero, ())]
+        while stack and time.perf_counter() <= deadline:
+            ub, i, left, value, s_cnt, r_cnt, c_cnt, pick = stack.pop()
+            nodes += 1
+            if best_value is not None and ub <= best_value + 1e-9:
+                continue
+            if left == 0:
+                # Full team with every minimum met (children are only pushed when feasible)
+                best_value, best_pick = value, pick
+                continue
+            if i == T:
+                continue
+            s, r = self.skill_of[i], self.rank_of[i]
+            most = int(min(self.sizes[i], left, self.s_hi[s] - s_cnt[s], self.r_hi[r] - r_cnt[r]))
+            children = []
+            for k in range(most + 1):
+                ns, nr, nc = s_cnt.copy(), r_cnt.copy(), c_cnt + self.covers[i] * k
+                ns[s] += k
+                nr[r] += k
+                if not self._feasible(i + 1, left - k, ns, nr, nc):
+                    continue
+                nb = self._bound(i + 1, left - k, value + self.prefix[i][k], ns)
+                if nb is None or (best_value is not None and nb <= best_value + 1e-9):
+                    continue
+                children.append((nb, i + 1, left - k, value + self.prefix[i][k], ns, nr, nc,
+                                 pick + ((i, k),) if k else pick))
+            # Most promising child on top of the stack, so the first dive follows the relaxation
+            children.sort(key=lambda node: node[0])
+            stack.extend(children)
+
+        # Unexplored nodes cap what the rest of the search could still have found
+        bounds = [node[0] for node in stack] + ([best_value] if best_value is not None else [])
+        bound = max(bounds) if bounds else None
+        if best_value is None:
+            status = "timeout" if stack else "infeasible"
+            positions = np.empty(0, dtype=np.intp)
+        else:
+            status = "feasible" if stack and bound > best_value + 1e-9 else "optimal"
+            positions = np.concatenate([self.members[i][:k] for i, k in best_pick] + [np.empty(0, np.intp)])
+            positions = positions[np.argsort(-self.values[positions], kind="stable")]
+        gap = None if best_value is None else (
+            0.0 if status == "optimal" else (bound - best_value) / max(abs(bound), 1e-9))
+        return {
+            "positions": positions,
+            "objective": best_value,
+            "bound": bound,
+            "gap": gap,
+            "status": status,
+            "nodes": nodes,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
@@ -1,6 +1,6 @@
 # app.py
-from flask import Flask, render_template, request, redirect, url_for, flash, session
-from werkzeug.exceptions import BadRequest
+from flask import Flask, render_template, request, redirect, url_for, flash, session, Response, stream_with_context
+from werkzeug.exceptions import BadRequest, NotFound, ServiceUnavailable
 from flask_login import (
     LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 )
@@ -16,11 +16,20 @@ load_dotenv()
 
 from config import Config
 from utils.logic import (
-    load_df, who_is_going_to_leave, medical_scores, who_needs_training,
-    leadership_list, skill_grouping, select_best_team, what_if_simulation
+    load_df, build_derived_frame, who_is_going_to_leave,
+    skill_grouping, select_best_team, select_best_teams, optimize_team,
+    what_if_simulation, what_if_batch, simulate_readiness, llm_client,
+    PAGE_SORTS, MEDICAL_COLUMNS, TRAINING_COLUMNS, LEADERSHIP_COLUMNS
 )
-
-import os, sys
+from utils.intent import vocabulary_for
+from utils.cache import ResultCache
+from utils.pagination import SortedPages, InvalidCursor, page_size, MAX_PAGE_SIZE
+from utils.indexes import indexes_for
+from utils.narrative import NarrativePool
+from utils.llm_cache import ResponseCache
+from utils.batching import MicroBatcher
+
+import os, sys, json, sqlite3, threading
 from urllib.parse import urlparse, urljoin
 
 # ---------------------------
@@ -102,7 +111,76 @@ def load_user(user_id):
 # ---------------------------
 # Load DataFrame used across pages
 # ---------------------------
-DF = load_df(app.config['DATA_CSV_PATH'])
+# Scores are derived once here; DF is read-only and shared by every view
+DF = build_derived_frame(load_df(app.config['DATA_CSV_PATH'], snapshot_dir=app.config.get('DATA_SNAPSHOT_DIR')))
+indexes_for(DF)  # build the range indexes now rather than on the first request
+
+# Report results keyed by (function, args, dataset version); see /cache-stats
+REPORT_CACHE = ResultCache(max_entries=app.config.get('REPORT_CACHE_SIZE', 256))
+# What-if results keyed by normalized (scenario, parameters) and dataset version
+SCENARIO_CACHE = ResultCache(max_entries=app.config.get('SCENARIO_CACHE_SIZE', 128))
+
+def _narrative_cache():
+    # On-disk narrative cache (NARRATIVE_CACHE_PATH); a read-only filesystem just means no cache
+    path = app.config.get('NARRATIVE_CACHE_PATH')
+    if not path:
+        return None
+    try:
+        return ResponseCache(
+            path,
+            ttl=app.config.get('NARRATIVE_CACHE_TTL_S', 7 * 24 * 3600),
+            max_bytes=app.config.get('NARRATIVE_CACHE_MB', 64) << 20,
+        )
+    except (OSError, sqlite3.Error) as e:
+        app.logger.warning(f"Narrative cache disabled: {path}: {e}")
+        return None
+
+# LLM narratives for what-if results, written in the background and fetched by job id;
+# answers are kept in an on-disk cache every worker on the node reads
+NARRATIVES = NarrativePool(
+    llm_client,
+    model=app.config.get('LLM_MODEL', 'gpt-4o-mini'),
+    workers=app.config.get('NARRATIVE_WORKERS', 2),
+    max_pending=app.config.get('NARRATIVE_MAX_PENDING', 16),
+    timeout=app.config.get('NARRATIVE_TIMEOUT_S', 20),
+    cache=_narrative_cache(),
+)
+
+def _report_rows(fn, **params):
+    """Memoized fn(DF, **params) as template-ready records."""
+    return REPORT_CACHE.get_or_compute(
+        fn.__name__, DF, lambda d, **p: fn(d, **p).to_dict(orient='records'), **params
+    )
+
+def _report_page(report, columns, stop_below=None):
+    """
+    One page of a big report table, driven by ?sort=, ?limit=, ?after= / ?before=.
+    Sort permutations are built once per dataset version and kept in REPORT_CACHE.
+    stop_below limits the page to rows whose first sort value is below it.
+    """
+    sorts = PAGE_SORTS[report]
+    sort = request.args.get('sort') or next(iter(sorts))
+    if sort not in sorts:
+        raise BadRequest(f"Unknown sort '{sort}'.")
+    by, ascending = sorts[sort]
+    pages = REPORT_CACHE.get_or_compute(f'pages:{report}', DF, SortedPages, by=by, ascending=ascending)
+    limit = page_size(request.args.get('limit'), maximum=app.config.get('PAGE_SIZE_MAX', MAX_PAGE_SIZE))
+    stop = pages.bound(stop_below) if stop_below is not None else None
+    try:
+        page = pages.page(after=request.args.get('after'), before=request.args.get('before'), limit=limit, stop=stop)
+    except InvalidCursor as e:
+        raise BadRequest(str(e))
+
+    args = {k: v for k, v in request.args.items() if k not in ('after', 'before')}
+    page.update(
+        sort=sort,
+        sorts=list(sorts),
+        limit=limit,
+        next_url=url_for(request.endpoint, **args, after=page['next']) if page['next'] else None,
+        prev_url=url_for(request.endpoint, **args, before=page['prev']) if page['prev'] else None,
+    )
+    rows = DF.loc[page.pop('index'), columns].to_dict(orient='records')
+    return rows, page
 
 # ---------------------------
 # ML Models (predictor)
@@ -113,17 +191,54 @@ if ML_MODELS_DIR not in sys.path:
     sys.path.append(ML_MODELS_DIR)
 
 try:
-    from predictor import predict_all  # inside models/predictor.py
+    from predictor import predict_many, features_frame, precompute_grid, model_stats, model_state, warm_up  # inside models/predictor.py
+    from predict_pool import PredictionPool, PoolBusy
 except Exception as e:
     raise RuntimeError(f"Could not import predictor from models: {e}")
 
+# Add Personnel choices discovered in the dataset; adjust if you standardize differently
+ROLE_CHOICES = ["Pilot", "Engineer", "Technician", "Radar Operator", "Cybersecurity", "Admin", "Medical"]
+SKILL_CHOICES = ["Technician", "Engineer", "Pilot", "Radar Operator", "Cybersecurity", "Admin", "Medical"]
+
+if app.config.get('MODEL_WARMUP', '1') != '0':
+    # Load the models before the first /add-personnel instead of inside it; see /readyz
+    warm_up(sklearn=app.config.get('MODEL_WARMUP') == 'all', background=True)
+
+# Predictions keyed by normalized input tuple; emptied when the model files change
+PREDICTION_CACHE = ResultCache(max_entries=app.config.get('PREDICTION_CACHE_SIZE', 65536))
+if app.config.get('PREDICTION_GRID'):
+    # Prefill the common inputs in the background so most predictions skip sklearn
+    threading.Thread(
+        target=precompute_grid,
+        args=(PREDICTION_CACHE, ROLE_CHOICES, SKILL_CHOICES, range(0, 31), range(40, 101, 5)),
+        name="prediction-grid",
+        daemon=True,
+    ).start()
+
+# Optional worker processes that run the model scoring, keeping it off this worker's GIL
+PREDICTION_POOL = None
+if app.config.get('PREDICT_POOL_PROCESSES', 0) > 0:
+    PREDICTION_POOL = PredictionPool(
+        processes=app.config['PREDICT_POOL_PROCESSES'],
+        max_pending=app.config.get('PREDICT_POOL_MAX_PENDING', 8),
+        wait=app.config.get('PREDICT_POOL_WAIT_S', 5),
+    )
+
+# Concurrent single-person predictions (e.g. /add-personnel) share one predict call per model
+PREDICTION_BATCHER = MicroBatcher(
+    lambda rows: predict_many(rows, cache=PREDICTION_CACHE, pool=PREDICTION_POOL),
+    window_ms=app.config.get('PREDICT_BATCH_WINDOW_MS', 3),
+    max_batch=app.config.get('PREDICT_MICRO_BATCH_MAX', 64),
+    name="predict-batcher",
+)
+
 # ---------------------------
 # Security middleware
 # ---------------------------
 @app.before_request
 def security_check():
-    # Skip security check for login page and static files
-    if request.endpoint in ['login', 'static']:
+    # Skip security check for login page, static files and the liveness/readiness probes
+    if request.endpoint in ['login', 'static', 'healthz', 'readyz']:
         return
     
     # Check if user is authenticated for all other routes
@@ -242,32 +357,32 @@ def add_admin():
 @app.route('/attrition')
 @login_required
 def attrition_view():
-    table = who_is_going_to_leave(DF).to_dict(orient='records')
+    table = _report_rows(who_is_going_to_leave)
     return render_template('attrition.html', rows=table)
 
 @app.route('/medical')
 @login_required
 def medical_view():
-    table = medical_scores(DF).to_dict(orient='records')
-    return render_template('medical.html', rows=table)
+    table, page = _report_page('medical', MEDICAL_COLUMNS)
+    return render_template('medical.html', rows=table, page=page)
 
 @app.route('/training')
 @login_required
 def training_view():
     thresh = int(request.args.get('thresh', 60))
-    table = who_needs_training(DF, thresh=thresh).to_dict(orient='records')
-    return render_template('training.html', rows=table, thresh=thresh)
+    table, page = _report_page('training', TRAINING_COLUMNS, stop_below=thresh)
+    return render_template('training.html', rows=table, thresh=thresh, page=page)
 
 @app.route('/leadership')
 @login_required
 def leadership_view():
-    table = leadership_list(DF).to_dict(orient='records')
-    return render_template('leadership.html', rows=table)
+    table, page = _report_page('leadership', LEADERSHIP_COLUMNS)
+    return render_template('leadership.html', rows=table, page=page)
 
 @app.route('/skills')
 @login_required
 def skills_view():
-    groups = skill_grouping(DF)
+    groups = REPORT_CACHE.get_or_compute('skill_grouping', DF, skill_grouping)
     return render_template('skills.html', groups=groups)
 
 @app.route("/readiness", methods=["GET", "POST"], endpoint="readiness_view")
@@ -287,15 +402,186 @@ def readiness():
     rows = team_df.to_dict(orient="records")
     return render_template("readiness.html", team=rows)
 
+@app.post("/readiness/batch")
+@login_required
+def readiness_batch():
+    body = request.get_json(silent=True)
+    teams = body.get("teams") if isinstance(body, dict) else None
+    if not isinstance(teams, list) or not teams:
+        raise BadRequest("Expected a JSON object with a non-empty 'teams' list.")
+    if len(teams) > app.config.get('TEAM_BATCH_MAX', 100):
+        raise BadRequest(f"At most {app.config.get('TEAM_BATCH_MAX', 100)} teams per request.")
+
+    specs = []
+    for i, t in enumerate(teams):
+        if not isinstance(t, dict):
+            raise BadRequest(f"teams[{i}] must be an object.")
+        try:
+            headcount = int(t.get("headcount", 10))
+        except (TypeError, ValueError):
+            raise BadRequest(f"teams[{i}].headcount must be an integer.")
+        if headcount < 1:
+            raise BadRequest(f"teams[{i}].headcount must be at least 1.")
+        roles = t.get("roles") or []
+        if isinstance(roles, str):
+            roles = roles.split(",")
+        required_roles = [str(r).strip() for r in roles if str(r).strip()]
+        # Same default as /readiness: naming roles restricts the pick to them
+        restrict = t.get("restrict_to_roles")
+        specs.append({
+            "headcount": headcount,
+            "required_roles": required_roles or None,
+            "restrict_to_roles": bool(required_roles) if restrict is None else bool(restrict),
+        })
+
+    results = select_best_teams(DF, specs)
+    return {"teams": [
+        {"headcount": s["headcount"], "roles": s["required_roles"] or [], "restrict_to_roles": s["restrict_to_roles"], "team": rows}
+        for s, rows in zip(specs, results)
+    ]}, 200
+
+def _count_map(body, key):
+    # {label: non-negative int} constraint maps in the optimizer request body
+    raw = body.get(key) or {}
+    if not isinstance(raw, dict):
+        raise BadRequest(f"'{key}' must be an object of label -> count.")
+    try:
+        out = {str(k): int(v) for k, v in raw.items()}
+    except (TypeError, ValueError):
+        raise BadRequest(f"'{key}' counts must be integers.")
+    if any(v < 0 for v in out.values()):
+        raise BadRequest(f"'{key}' counts must be non-negative.")
+    return out
+
+@app.post("/readiness/optimize")
+@login_required
+def readiness_optimize():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        raise BadRequest("Expected a JSON object.")
+    try:
+        headcount = int(body.get("headcount", 10))
+        budget_ms = float(body.get("time_budget_ms", app.config.get('TEAM_SOLVER_BUDGET_MS', 300)))
+    except (TypeError, ValueError):
+        raise BadRequest("headcount and time_budget_ms must be numbers.")
+    if headcount < 1:
+        raise BadRequest("headcount must be at least 1.")
+    budget_ms = min(max(budget_ms, 0.0), app.config.get('TEAM_SOLVER_MAX_BUDGET_MS', 2000))
+
+    try:
+        result = optimize_team(
+            DF,
+            headcount=headcount,
+            skill_min=_count_map(body, "skill_min"),
+            skill_max=_count_map(body, "skill_max"),
+            min_medical=body.get("min_medical") or None,
+            min_readiness=body.get("min_readiness") or None,
+            rank_min=_count_map(body, "rank_min"),
+            rank_max=_count_map(body, "rank_max"),
+            cover=_count_map(body, "cover"),
+            time_budget=budget_ms / 1000.0,
+        )
+    except ValueError as e:
+        raise BadRequest(str(e))
+    result["team"] = result["team"].to_dict(orient="records")
+    return result, 200
+
 @app.route('/whatif', methods=['GET','POST'])
 @login_required
 def whatif_view():
     result = None
     if request.method == 'POST':
         text = request.form.get('query', '')
-        result = what_if_simulation(DF, text)
+        result = what_if_simulation(DF, text, cache=SCENARIO_CACHE)
+        # Tables now, narrative later (see /whatif/narrative/<job_id>)
+        result = {**result, "narrative_job": NARRATIVES.submit(result)}
     return render_template('whatif.html', result=result)
 
+@app.get("/whatif/narrative/<job_id>")
+@login_required
+def whatif_narrative(job_id):
+    job = NARRATIVES.get(job_id)
+    if job is None:
+        raise NotFound("Unknown or expired narrative job.")
+    return job, 200
+
+@app.get("/whatif/narrative/<job_id>/stream")
+@login_required
+def whatif_narrative_stream(job_id):
+    # Server-sent events: the job state now, then once more when it finishes (or times out)
+    job = NARRATIVES.get(job_id)
+    if job is None:
+        raise NotFound("Unknown or expired narrative job.")
+
+    def events():
+        state = job
+        yield f"event: {state['status']}\ndata: {json.dumps(state)}\n\n"
+        if state["status"] in ("pending", "running"):
+            state = NARRATIVES.wait(job_id)
+            yield f"event: {state['status']}\ndata: {json.dumps(state)}\n\n"
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/whatif/batch")
+@login_required
+def whatif_batch():
+    body = request.get_json(silent=True)
+    queries = body.get("queries") if isinstance(body, dict) else None
+    if not isinstance(queries, list) or not queries:
+        raise BadRequest("Expected a JSON object with a non-empty 'queries' list.")
+    if len(queries) > app.config.get('WHATIF_BATCH_MAX', 500):
+        raise BadRequest(f"At most {app.config.get('WHATIF_BATCH_MAX', 500)} queries per request.")
+    queries = [str(q) for q in queries]
+
+    if request.args.get("format") == "json":
+        results = [None] * len(queries)
+        for i, result in what_if_batch(DF, queries, cache=SCENARIO_CACHE):
+            results[i] = result
+        return Response(json.dumps({"results": results}, default=str), mimetype="application/json")
+
+    # NDJSON: one line per query as soon as its scenario group is done ("index" is its input position)
+    def stream():
+        for i, result in what_if_batch(DF, queries, cache=SCENARIO_CACHE):
+            yield json.dumps({"index": i, **result}, default=str) + "\n"
+    return Response(stream_with_context(stream()), mimetype="application/x-ndjson")
+
+@app.post("/whatif/simulate")
+@login_required
+def whatif_simulate():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        raise BadRequest("Expected a JSON object.")
+    try:
+        trials = int(body.get("trials", 10000))
+        horizon = float(body.get("horizon_years", 1.0))
+        seed = None if body.get("seed") is None else int(body["seed"])
+    except (TypeError, ValueError):
+        raise BadRequest("trials, horizon_years and seed must be numbers.")
+    if not 1 <= trials <= app.config.get('MC_MAX_TRIALS', 20000):
+        raise BadRequest(f"trials must be between 1 and {app.config.get('MC_MAX_TRIALS', 20000)}.")
+    if not 0 <= horizon <= 30:
+        raise BadRequest("horizon_years must be between 0 and 30.")
+    steps = body.get("steps") or []
+    if isinstance(steps, str):
+        steps = [steps]
+    if not isinstance(steps, list):
+        raise BadRequest("'steps' must be a list of what-if steps.")
+    team = _count_map(body, "team")
+    unknown = sorted(set(team) - set(vocabulary_for(DF).skills))
+    if unknown:
+        raise BadRequest(f"Unknown skills in 'team': {', '.join(unknown)}.")
+
+    result = simulate_readiness(
+        DF,
+        trials=trials,
+        horizon=horizon,
+        team=team,
+        steps=[str(s) for s in steps],
+        seed=seed,
+        chunk_bytes=app.config.get('MC_CHUNK_MB', 64) << 20,
+    )
+    return result, 200
+
 @app.route("/readiness-status")
 @login_required
 def readiness_status():
@@ -303,16 +589,24 @@ def readiness_status():
     data = logic.get_readiness_data()
     return render_template("readiness_status.html", data=data)
 
+@app.get("/cache-stats")
+@login_required
+def cache_stats():
+    return {
+        "reports": REPORT_CACHE.stats(),
+        "scenarios": SCENARIO_CACHE.stats(),
+        "narratives": NARRATIVES.stats(),
+        "predictions": {**PREDICTION_CACHE.stats(), "batching": PREDICTION_BATCHER.stats(),
+                        "pool": PREDICTION_POOL.stats() if PREDICTION_POOL is not None else None},
+        "models": model_stats(),
+    }, 200
+
 # ---------------------------
 # Add Personnel (Predictive) — ONLY necessary inputs; targets are predicted
 # ---------------------------
 @app.route("/add-personnel", methods=["GET", "POST"])
 @login_required
 def add_personnel():
-    # choices discovered in your dataset; adjust if you standardize differently
-    ROLE_CHOICES = ["Pilot", "Engineer", "Technician", "Radar Operator", "Cybersecurity", "Admin", "Medical"]
-    SKILL_CHOICES = ["Technician", "Engineer", "Pilot", "Radar Operator", "Cybersecurity", "Admin", "Medical"]
-
     if request.method == "POST":
         try:
             person_name = (request.form.get("name") or "").strip()
@@ -329,7 +623,13 @@ def add_personnel():
             if experience_years < 0 or medical_score < 0:
                 raise BadRequest("Experience years and medical score must be non-negative.")
 
-            preds = predict_all(role, skills, experience_years, training_completed, medical_score)
+            preds = PREDICTION_BATCHER.call({
+                "role": role,
+                "skills": skills,
+                "experience_years": experience_years,
+                "training_completed": training_completed,
+                "medical_score": medical_score,
+            })
 
             # (optional) save to DB here if you have a model
             flash("Personnel added. Predictions generated successfully.", "success")
@@ -352,6 +652,52 @@ def add_personnel():
                            preds=None,
                            name="")
 
+@app.post("/add-personnel/batch")
+@login_required
+def add_personnel_batch():
+    # Bulk onboarding: {"personnel": [{name, role, skills, experience_years, training_completed, medical_score}, ...]}
+    body = request.get_json(silent=True)
+    people = body.get("personnel") if isinstance(body, dict) else None
+    if not isinstance(people, list) or not people:
+        raise BadRequest("Expected a JSON object with a non-empty 'personnel' list.")
+    if len(people) > app.config.get('PREDICT_BATCH_MAX', 10000):
+        raise BadRequest(f"At most {app.config.get('PREDICT_BATCH_MAX', 10000)} personnel per request.")
+    for i, p in enumerate(people):
+        if not isinstance(p, dict):
+            raise BadRequest(f"personnel[{i}] must be an object.")
+        if not str(p.get("role") or "").strip() or not str(p.get("skills") or "").strip():
+            raise BadRequest(f"personnel[{i}]: role and skills are required.")
+
+    rows = [{
+        "role": str(p["role"]).strip(),
+        "skills": str(p["skills"]).strip(),
+        "experience_years": p.get("experience_years", 0),
+        "training_completed": p.get("training_completed", False),
+        "medical_score": p.get("medical_score", 0),
+    } for p in people]
+    try:
+        features = features_frame(rows)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    if (features["experience_years"] < 0).any() or (features["medical_score"] < 0).any():
+        raise BadRequest("Experience years and medical score must be non-negative.")
+    try:
+        preds = predict_many(features, cache=PREDICTION_CACHE, pool=PREDICTION_POOL)
+    except PoolBusy as e:
+        raise ServiceUnavailable(str(e))
+    return {"predictions": [
+        {"name": (p.get("name") or "").strip(), **pred} for p, pred in zip(people, preds)
+    ]}, 200
+
+
+@app.get("/readyz")
+def readyz():
+    # Readiness: 503 until the predictor's models are loaded; a cold or failed predictor starts loading
+    state = model_state()
+    if state["state"] in ("cold", "failed"):
+        state = warm_up(sklearn=app.config.get('MODEL_WARMUP') == 'all', background=True)
+    return state, (200 if state["ready"] else 503)
+
 # ---------------------------
 # Main
 # ---------------------------
@@ -15,4 +15,50 @@ class Config:
         "DATA_CSV_PATH",
         (BASE_DIR / 'data' / 'IAF_Human_Management_Synthetic_Dataset.csv').as_posix()
     )
+    # Where load_df keeps its Arrow snapshot of the CSV (default: data/.snapshots)
+    DATA_SNAPSHOT_DIR = os.environ.get("DATA_SNAPSHOT_DIR")
+    # Max memoized report results per worker (LRU beyond that)
+    REPORT_CACHE_SIZE = int(os.environ.get("REPORT_CACHE_SIZE", 256))
+    # Max memoized what-if scenario results per worker (LRU beyond that)
+    SCENARIO_CACHE_SIZE = int(os.environ.get("SCENARIO_CACHE_SIZE", 128))
+    # Upper bound for ?limit= on the paginated report tables
+    PAGE_SIZE_MAX = int(os.environ.get("PAGE_SIZE_MAX", 500))
+    # Default and ceiling for the team optimizer's search time (milliseconds)
+    TEAM_SOLVER_BUDGET_MS = int(os.environ.get("TEAM_SOLVER_BUDGET_MS", 300))
+    TEAM_SOLVER_MAX_BUDGET_MS = int(os.environ.get("TEAM_SOLVER_MAX_BUDGET_MS", 2000))
+    # Max team specs accepted by one /readiness/batch request
+    TEAM_BATCH_MAX = int(os.environ.get("TEAM_BATCH_MAX", 100))
+    # Max queries accepted by one /whatif/batch request
+    WHATIF_BATCH_MAX = int(os.environ.get("WHATIF_BATCH_MAX", 500))
+    # Ceiling on Monte Carlo trials per /whatif/simulate request, and its working-set size (MB)
+    MC_MAX_TRIALS = int(os.environ.get("MC_MAX_TRIALS", 20000))
+    MC_CHUNK_MB = int(os.environ.get("MC_CHUNK_MB", 64))
+    # What-if narratives: chat model, background workers, queued-job limit, per-call timeout (seconds)
+    LLM_MODEL = os.environ.get("LLM_MODEL", "gpt-4o-mini")
+    NARRATIVE_WORKERS = int(os.environ.get("NARRATIVE_WORKERS", 2))
+    NARRATIVE_MAX_PENDING = int(os.environ.get("NARRATIVE_MAX_PENDING", 16))
+    NARRATIVE_TIMEOUT_S = int(os.environ.get("NARRATIVE_TIMEOUT_S", 20))
+    # On-disk narrative cache shared by the workers on this node ("" disables it), its TTL and size cap
+    NARRATIVE_CACHE_PATH = os.environ.get(
+        "NARRATIVE_CACHE_PATH",
+        (BASE_DIR / 'data' / '.llm_cache.sqlite').as_posix()
+    )
+    NARRATIVE_CACHE_TTL_S = int(os.environ.get("NARRATIVE_CACHE_TTL_S", 7 * 24 * 3600))
+    NARRATIVE_CACHE_MB = int(os.environ.get("NARRATIVE_CACHE_MB", 64))
+    # Max personnel accepted by one /add-personnel/batch request
+    PREDICT_BATCH_MAX = int(os.environ.get("PREDICT_BATCH_MAX", 10000))
+    # Micro-batching of concurrent single predictions: collection window (ms, 0 = off) and batch cap
+    PREDICT_BATCH_WINDOW_MS = float(os.environ.get("PREDICT_BATCH_WINDOW_MS", 3))
+    PREDICT_MICRO_BATCH_MAX = int(os.environ.get("PREDICT_MICRO_BATCH_MAX", 64))
+    # Memoized predictions per worker, and whether to prefill them over the common input grid at startup
+    PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", 65536))
+    PREDICTION_GRID = os.environ.get("PREDICTION_GRID", "0") == "1"
+    # Load the models in the background at startup: "1" the compiled models, "all" also the
+    # sklearn pipelines used for large batches, "0" on first use (/readyz then starts it)
+    MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "1")
+    # Out-of-process prediction: worker processes (0 = predict in the web worker), requests queued
+    # or running at once, and seconds a request waits for room before failing
+    PREDICT_POOL_PROCESSES = int(os.environ.get("PREDICT_POOL_PROCESSES", 0))
+    PREDICT_POOL_MAX_PENDING = int(os.environ.get("PREDICT_POOL_MAX_PENDING", 8))
+    PREDICT_POOL_WAIT_S = float(os.environ.get("PREDICT_POOL_WAIT_S", 5))
     OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
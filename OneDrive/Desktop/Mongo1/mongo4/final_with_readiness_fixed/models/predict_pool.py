@@ -0,0 +1,146 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class PoolBusy(RuntimeError):
+    """Raised when a PredictionPool has no room within its wait time."""
+
+
+def _warm():
+    # Worker initializer: load the models before the first request needs them
+    import predictor
+    predictor.warm_up()
+
+
+def _score(x_name: str, shape: tuple, out_name: str, widths: list) -> None:
+    # In a worker: score the encoded rows in one shared block into the other, target after target
+    import predictor
+    x_block = shared_memory.SharedMemory(name=x_name)
+    out_block = shared_memory.SharedMemory(name=out_name)
+    try:
+        X = np.ndarray(shape, dtype=np.float32, buffer=x_block.buf)
+        out = np.ndarray((shape[0], sum(widths)), dtype=np.float64, buffer=out_block.buf)
+        at = 0
+        for proba, width in zip(predictor.proba_encoded(X).values(), widths):
+            out[:, at:at + width] = proba
+            at += width
+        del X, out
+    finally:
+        x_block.close()
+        out_block.close()
+
+
+class PredictionPool:
+    """
+    Scores predictions in worker processes, so tree walks hold those processes' GILs instead of
+    the web worker's, whose other threads keep serving pages.
+    - Rows are encoded in the caller (cheap) into a shared-memory block; a worker maps it and
+      writes every target's probabilities into a second block. Only block names and shapes
+      cross the process boundary, never the arrays.
+    - processes workers, started on first use from a fresh interpreter (spawn), each loading the
+      models once (memory-mapped artifacts, see predictor.ARTIFACTS_DIR).
+    - Backpressure: at most max_pending requests queued or running; a caller waits up to
+      wait seconds for room, then gets PoolBusy.
+    Each web worker process has its own pool, created on first use after a fork.
+    """
+
+    def __init__(self, processes: int = 2, max_pending: int = 8, wait: float = 5.0):
+        self.processes = max(int(processes), 1)
+        self.max_pending = max(int(max_pending), 1)
+        self.wait = wait
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.requests = 0
+        self.rows = 0
+        self.rejected = 0
+        self.failed = 0
+        self.restarts = 0
+        self.total_ms = 0.0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                if self._pid is not None and self._pid != os.getpid():
+                    # Forked: the parent's workers and slot holders are not ours
+                    self._slots = threading.BoundedSemaphore(self.max_pending)
+                self._pid = os.getpid()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm,
+                )
+            return self._executor
+
+    def proba(self, X: np.ndarray, widths: dict) -> dict:
+        """
+        target -> predict_proba for encoded rows X (CompiledModels.encode), as
+        predictor.proba_encoded computes it; widths: target -> number of classes, in target order.
+        """
+        self._pool()
+        slots = self._slots
+        if not slots.acquire(timeout=self.wait):
+            with self._lock:
+                self.rejected += 1
+            raise PoolBusy(f"prediction pool busy: {self.max_pending} requests pending for {self.wait:g}s")
+        started = time.perf_counter()
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        blocks = []
+        try:
+            x_block = shared_memory.SharedMemory(create=True, size=max(X.nbytes, 1))
+            blocks.append(x_block)
+            out_block = shared_memory.SharedMemory(create=True, size=max(len(X) * sum(widths.values()) * 8, 1))
+            blocks.append(out_block)
+            np.ndarray(X.shape, dtype=np.float32, buffer=x_block.buf)[:] = X
+            try:
+                self._pool().submit(_score, x_block.name, X.shape, out_block.name, list(widths.values())).result()
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); the next request starts a fresh pool
+                with self._lock:
+                    broken, self._executor = self._executor, None
+                    self.restarts += 1
+                if broken is not None:
+                    broken.shutdown(wait=False)
+                raise
+            out = np.ndarray((len(X), sum(widths.values())), dtype=np.float64, buffer=out_block.buf)
+            result, at = {}, 0
+            for name, width in widths.items():
+                result[name] = out[:, at:at + width].copy()
+                at += width
+            del out
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+            slots.release()
+        with self._lock:
+            self.requests += 1
+            self.rows += len(X)
+            self.total_ms += (time.perf_counter() - started) * 1000
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "processes": self.processes,
+                "max_pending": self.max_pending,
+                "wait_s": self.wait,
+                "requests": self.requests,
+                "rows": self.rows,
+                "mean_ms": round(self.total_ms / self.requests, 2) if self.requests else 0.0,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "restarts": self.restarts,
+            }
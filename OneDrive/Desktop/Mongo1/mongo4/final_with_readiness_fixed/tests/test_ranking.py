@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.ranking import top_k
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_top_k_matches_stable_sort(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 80))
+    df = pd.DataFrame({
+        "score": rng.integers(0, 3, n).astype(float),
+        "years": rng.integers(0, 5, n),
+        "rating": pd.Categorical(rng.choice(["Average", "Good", "Excellent"], n),
+                                 categories=["Average", "Good", "Excellent"], ordered=True),
+        "name": rng.choice(["x", "y", "z"], n),
+    })
+    df.loc[rng.random(n) < 0.1, "score"] = np.nan
+    by = list(rng.permutation(df.columns)[:int(rng.integers(1, 5))])
+    ascending = [bool(a) for a in rng.integers(0, 2, len(by))]
+    k, offset = int(rng.integers(0, n + 2)), int(rng.integers(0, 5))
+    expected = df.sort_values(by, ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+    assert list(top_k(df, by, ascending, k=k, offset=offset)) == list(expected[offset:offset + k])
@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item calls into batched calls of fn(items) -> results.
+    - The first waiting item opens a window of window_ms; everything submitted before it closes
+      (or until max_batch items) goes to one fn call, and each caller gets its own result back.
+    - If a batch raises one of retry_on (errors caused by a bad item), its items are retried one
+      by one so the bad item fails only its caller. Any other error (e.g. an overloaded backend)
+      fails every caller in the batch at once.
+    - window_ms = 0 turns batching off: call runs fn([item]) in the calling thread.
+    Only concurrent callers in one process share batches (threaded workers, e.g. gunicorn gthread).
+    """
+
+    def __init__(self, fn, window_ms: float = 3.0, max_batch: int = 64, name: str = "batcher",
+                 retry_on=(ValueError, TypeError, KeyError)):
+        self.fn = fn
+        self.retry_on = tuple(retry_on)
+        self.window = max(float(window_ms), 0.0) / 1000.0
+        self.max_batch = max(int(max_batch), 1)
+        self.name = name
+        self._queue = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self.batches = 0
+        self.items = 0
+        self.largest = 0
+        self.retries = 0
+
+    def call(self, item, timeout: float = None):
+        """fn([item])[0], possibly computed in a batch with other callers' items."""
+        if self.window == 0:
+            return self.fn([item])[0]
+        future = Future()
+        with self._cond:
+            self._ensure_thread()
+            self._queue.append((item, future))
+            self._cond.notify()
+        return future.result(timeout)
+
+    def _ensure_thread(self) -> None:
+        # One collector per process; a forked worker starts its own (called with the lock held)
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.window
+                while len(self._queue) < self.max_batch:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        break
+                    self._cond.wait(left)
+                batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+            self._run(batch)
+
+    def _run(self, batch) -> None:
+        try:
+            results = self.fn([item for item, _ in batch])
+        except Exception as e:
+            if len(batch) == 1 or not isinstance(e, self.retry_on):
+                for _, future in batch:
+                    future.set_exception(e)
+                return
+            with self._cond:
+                self.retries += 1
+            for one in batch:
+                self._run([one])
+            return
+        with self._cond:
+            self.batches += 1
+            self.items += len(batch)
+            self.largest = max(self.largest, len(batch))
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "window_ms": round(self.window * 1000, 3),
+                "max_batch": self.max_batch,
+                "queued": len(self._queue),
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "largest_batch": self.largest,
+                "split_retries": self.retries,
+            }
@@ -0,0 +1,236 @@
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# Numeric columns that get a sorted range index, with the value used for missing
+# entries (None: missing rows never match a range query)
+RANGE_INDEX_COLUMNS = {
+    "Training_Score": None,
+    "BMI": None,
+    "Age": None,
+    "Years_of_Service": None,
+    "Missions_Completed": None,
+    "Medical_Score": None,
+}
+# Categorical columns that get one bitmap per distinct value
+BITMAP_INDEX_COLUMNS = [
+    "Primary_Skill", "Secondary_Skill", "Rank", "Medical_Category",
+    "Performance_Rating", "Leadership_Potential", "Readiness_Level",
+]
+
+# Set bits per byte value, for counting packed bitmaps
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+
+class Bitmap:
+    """
+    Row selection packed 8 rows per byte. &, | and ~ combine selections a byte at a
+    time, so a multi-criteria filter is one pass over n/8 bytes with no frame copies.
+    """
+
+    __slots__ = ("bits", "size")
+
+    def __init__(self, bits: np.ndarray, size: int):
+        self.bits = bits
+        self.size = size
+
+    @classmethod
+    def from_mask(cls, mask) -> "Bitmap":
+        mask = np.asarray(mask, dtype=bool)
+        return cls(np.packbits(mask), len(mask))
+
+    @classmethod
+    def from_positions(cls, positions, size: int) -> "Bitmap":
+        mask = np.zeros(size, dtype=bool)
+        mask[positions] = True
+        return cls.from_mask(mask)
+
+    @classmethod
+    def full(cls, size: int) -> "Bitmap":
+        return cls.from_mask(np.ones(size, dtype=bool))
+
+    @classmethod
+    def empty(cls, size: int) -> "Bitmap":
+        return cls(np.zeros((size + 7) // 8, dtype=np.uint8), size)
+
+    def __and__(self, other):
+        return Bitmap(self.bits & other.bits, self.size)
+
+    def __or__(self, other):
+        return Bitmap(self.bits | other.bits, self.size)
+
+    def __invert__(self):
+        bits = ~self.bits
+        if self.size % 8:
+            # packbits pads the last byte with zeros; keep the padding clear
+            bits[-1] &= np.uint8(0xFF << (8 - self.size % 8) & 0xFF)
+        return Bitmap(bits, self.size)
+
+    def count(self) -> int:
+        return int(_POPCOUNT[self.bits].sum())
+
+    def mask(self) -> np.ndarray:
+        return np.unpackbits(self.bits, count=self.size).astype(bool)
+
+    def positions(self) -> np.ndarray:
+        return np.flatnonzero(np.unpackbits(self.bits, count=self.size))
+
+
+class BitmapIndex:
+    """One Bitmap per distinct value of a categorical column."""
+
+    def __init__(self, values):
+        s = values if isinstance(values, pd.Series) else pd.Series(values)
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            codes, uniques = s.cat.codes.to_numpy(), s.cat.categories
+        else:
+            codes, uniques = pd.factorize(s)
+        self.size = len(s)
+        self.values = [str(u) for u in uniques]
+        self.bitmaps = {v: Bitmap.from_mask(codes == i) for i, v in enumerate(self.values)}
+
+    def _union(self, values) -> Bitmap:
+        out = Bitmap.empty(self.size)
+        for v in values:
+            if v in self.bitmaps:
+                out = out | self.bitmaps[v]
+        return out
+
+    def isin(self, values) -> Bitmap:
+        return self._union(str(v) for v in values)
+
+    def contains(self, pattern: str, case: bool = False) -> Bitmap:
+        """Rows whose value matches the regex, like str.contains(pattern, case=case, na=False)."""
+        hits = pd.Series(self.values, dtype=object).str.contains(pattern, case=case, na=False)
+        return self._union(v for v, hit in zip(self.values, hits) if hit)
+
+
+class SortedColumnIndex:
+    """
+    Sorted copy of one numeric column plus the row positions that produce it.
+    Range queries are two binary searches and a slice: O(log n + k), already ordered
+    by value (ties in row order).
+    """
+
+    def __init__(self, values, fill=None):
+        v = np.asarray(values, dtype=float)
+        if fill is not None:
+            v = np.where(np.isnan(v), fill, v)
+        valid = np.flatnonzero(~np.isnan(v))
+        self.order = valid[np.argsort(v[valid], kind="stable")]
+        # Rows left out as missing, in row order
+        self.missing = np.flatnonzero(np.isnan(v))
+        self.sorted = v[self.order]
+        self.size = len(v)
+
+    def select(self, lo=None, hi=None, lo_inclusive: bool = True, hi_inclusive: bool = False) -> np.ndarray:
+        """Row positions with lo <= value < hi (bounds optional, inclusivity adjustable), in value order."""
+        start = 0 if lo is None else np.searchsorted(self.sorted, lo, "left" if lo_inclusive else "right")
+        stop = self.size if hi is None else np.searchsorted(self.sorted, hi, "right" if hi_inclusive else "left")
+        return self.order[start:max(start, stop)]
+
+    def lt(self, x):
+        return self.select(hi=x)
+
+    def ge(self, x):
+        return self.select(lo=x)
+
+    def between(self, lo, hi):
+        return self.select(lo=lo, hi=hi)
+
+    def count(self, lo=None, hi=None, lo_inclusive: bool = True, hi_inclusive: bool = False) -> int:
+        return len(self.select(lo, hi, lo_inclusive, hi_inclusive))
+
+    def bitmap(self, lo=None, hi=None, lo_inclusive: bool = True, hi_inclusive: bool = False) -> Bitmap:
+        return Bitmap.from_positions(self.select(lo, hi, lo_inclusive, hi_inclusive), self.size)
+
+
+class FrameIndexes:
+    """All secondary indexes over one derived frame, built once and never mutated."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.size = len(df)
+        self.ranges = {
+            col: SortedColumnIndex(df[col].to_numpy(dtype=float, na_value=np.nan), fill)
+            for col, fill in RANGE_INDEX_COLUMNS.items() if col in df.columns
+        }
+        self.bitmaps = {col: BitmapIndex(df[col]) for col in BITMAP_INDEX_COLUMNS if col in df.columns}
+        # Structures owned by other modules (see frame_extra), built on demand
+        self.extras = {}
+
+
+# id(frame) -> (weakref to frame, FrameIndexes); entries vanish with their frame
+_REGISTRY = {}
+_LOCK = threading.Lock()
+
+
+def indexes_for(df: pd.DataFrame):
+    """
+    Indexes for a frame from build_derived_frame, built on first use.
+    Returns None for any other frame, so callers fall back to plain scans.
+    """
+    if not df.attrs.get("derived"):
+        return None
+    key = id(df)
+    entry = _REGISTRY.get(key)
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+    with _LOCK:
+        entry = _REGISTRY.get(key)
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+        built = FrameIndexes(df)
+        _REGISTRY[key] = (weakref.ref(df, lambda _, k=key: _REGISTRY.pop(k, None)), built)
+        return built
+
+
+def frame_extra(df: pd.DataFrame, name: str, build):
+    """
+    build(df), computed once per derived frame and kept with its indexes.
+    For any other frame it is simply built on every call.
+    """
+    idx = indexes_for(df)
+    if idx is None:
+        return build(df)
+    if name not in idx.extras:
+        with _LOCK:
+            if name not in idx.extras:
+                idx.extras[name] = build(df)
+    return idx.extras[name]
+
+
+def all_rows(df: pd.DataFrame) -> Bitmap:
+    return Bitmap.full(len(df))
+
+
+def in_range(df: pd.DataFrame, col: str, lo=None, hi=None, lo_inclusive: bool = True, hi_inclusive: bool = False) -> Bitmap:
+    """Rows with lo <= df[col] < hi, answered from the range index when there is one."""
+    idx = indexes_for(df)
+    if idx is not None and col in idx.ranges:
+        return idx.ranges[col].bitmap(lo, hi, lo_inclusive, hi_inclusive)
+    s = df[col]
+    fill = RANGE_INDEX_COLUMNS.get(col)
+    if fill is not None:
+        s = s.fillna(fill)
+    out = s.notna()
+    if lo is not None:
+        out &= (s >= lo) if lo_inclusive else (s > lo)
+    if hi is not None:
+        out &= (s <= hi) if hi_inclusive else (s < hi)
+    return Bitmap.from_mask(out.to_numpy())
+
+
+def in_category(df: pd.DataFrame, col: str, values=None, contains: str = None) -> Bitmap:
+    """
+    Rows whose df[col] is one of values, or matches the case-insensitive regex contains.
+    The regex runs over the handful of distinct values, never over the rows.
+    """
+    idx = indexes_for(df)
+    if idx is not None and col in idx.bitmaps:
+        bitmap = idx.bitmaps[col]
+        return bitmap.isin(values) if contains is None else bitmap.contains(contains)
+    s = df[col]
+    mask = s.isin(values) if contains is None else s.str.contains(contains, case=False, na=False)
+    return Bitmap.from_mask(mask.to_numpy(dtype=bool))
@@ -0,0 +1,206 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+NARRATIVE_SYSTEM_PROMPT = (
+    "You are a personnel planning analyst for the Indian Air Force. "
+    "Write a short briefing (at most 150 words) on the what-if result you are given: "
+    "the operational impact, the main risk, and one recommended action. Do not invent numbers."
+)
+# Rows of the result table quoted in the prompt
+PROMPT_ROWS = 10
+# Bump whenever NARRATIVE_SYSTEM_PROMPT or narrative_prompt changes: cached answers to the old wording are then unused
+PROMPT_VERSION = 1
+
+
+def narrative_prompt(result: dict) -> str:
+    """User message for a what-if result: the query, its analysis, and the first few rows."""
+    lines = [f"Query: {result.get('query', '')}", f"Scenario: {result.get('action', '')}"]
+    if result.get("analysis"):
+        lines.append(str(result["analysis"]).strip())
+    if result.get("summary"):
+        lines.append(f"Remaining roster: {result['summary']}")
+    data = result.get("data") or []
+    if data:
+        lines.append(f"Affected records: {len(data)}; first {min(len(data), PROMPT_ROWS)}:")
+        lines.extend(str(row) for row in data[:PROMPT_ROWS])
+    return "\n".join(lines)
+
+
+def job_id(model: str, prompt: str) -> str:
+    # Content address of (model, prompt template version, scenario data digest): the same
+    # briefing is one job and one cache entry, whichever worker asks
+    digest = hashlib.sha256(prompt.encode()).hexdigest()
+    return hashlib.sha256(f"{model}\0{PROMPT_VERSION}\0{digest}".encode()).hexdigest()[:32]
+
+
+class NarrativePool:
+    """
+    LLM narratives generated off the request path.
+    - client_factory() returns an OpenAI-style client (client.chat.completions.create) or None;
+      point OPENAI_BASE_URL at utils/llm_stub.py to run against a local stub instead of the API.
+    - At most workers calls run at once and max_pending jobs wait; submit returns None beyond that.
+    - Each call gets timeout seconds; a job still running past it is reported as "timeout".
+    - Finished jobs are kept (newest keep of them) for polling; ids are content hashes, so
+      resubmitting the same prompt while it runs or after it finished reuses that job.
+    - cache: an optional ResponseCache. Answers are stored under the job id, and a cached answer
+      is served without calling the model (no client needed), from any worker sharing the file.
+    Running jobs live in this process: poll the worker that submitted, or use the SSE stream.
+    """
+
+    def __init__(self, client_factory, model: str, workers: int = 2, max_pending: int = 16,
+                 timeout: float = 20.0, keep: int = 256, cache=None):
+        self.client_factory = client_factory
+        self.model = model
+        self.cache = cache
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.keep = keep
+        self._executor = ThreadPoolExecutor(max_workers=max(int(workers), 1), thread_name_prefix="narrative")
+        self._jobs = OrderedDict()
+        self._cond = threading.Condition()
+        self.submitted = 0
+        self.rejected = 0
+        self.failed = 0
+        self.timeouts = 0
+
+    def submit(self, result: dict):
+        """Queue a narrative for a what-if result; its job id, or None (no client, or pool full)."""
+        prompt = narrative_prompt(result)
+        jid = job_id(self.model, prompt)
+        with self._cond:
+            job = self._jobs.get(jid)
+            if job is not None and job["status"] in ("pending", "running", "done"):
+                return jid
+        cached = self._cached(jid)
+        if cached is not None:
+            with self._cond:
+                self._jobs[jid] = cached
+                self._trim()
+            return jid
+        client = self.client_factory()
+        if client is None:
+            return None
+        with self._cond:
+            job = self._jobs.get(jid)
+            if job is not None and job["status"] in ("pending", "running", "done"):
+                return jid
+            if sum(j["status"] in ("pending", "running") for j in self._jobs.values()) >= self.max_pending:
+                self.rejected += 1
+                return None
+            self._jobs[jid] = {"id": jid, "status": "pending", "narrative": None, "error": None, "cached": False,
+                               "submitted": time.time(), "started": None, "elapsed_ms": None}
+            self._jobs.move_to_end(jid)
+            self.submitted += 1
+            self._trim()
+        self._executor.submit(self._run, jid, client, prompt)
+        return jid
+
+    def _run(self, jid, client, prompt) -> None:
+        started = time.monotonic()
+        self._update(jid, status="running", started=time.time())
+        try:
+            response = client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "system", "content": NARRATIVE_SYSTEM_PROMPT},
+                          {"role": "user", "content": prompt}],
+                timeout=self.timeout,
+            )
+            text = (response.choices[0].message.content or "").strip()
+            update = {"status": "done", "narrative": text}
+        except Exception as e:
+            update = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+        elapsed = time.monotonic() - started
+        if elapsed > self.timeout:
+            # The client ignored its timeout; the answer came too late to use
+            update = {"status": "timeout", "narrative": None, "error": f"no answer within {self.timeout:g}s"}
+        if update["status"] == "done" and self.cache is not None:
+            try:
+                self.cache.put(jid, self.model, update["narrative"])
+            except Exception:
+                # A cache that cannot be written only costs the next caller a model call
+                pass
+        self._update(jid, elapsed_ms=round(elapsed * 1000, 1), **update)
+
+    def _cached(self, jid):
+        # A finished job built from the response cache, or None
+        if self.cache is None:
+            return None
+        try:
+            text = self.cache.get(jid)
+        except Exception:
+            return None
+        if text is None:
+            return None
+        return {"id": jid, "status": "done", "narrative": text, "error": None, "cached": True,
+                "submitted": time.time(), "started": None, "elapsed_ms": 0.0}
+
+    def _update(self, jid, **fields) -> None:
+        with self._cond:
+            job = self._jobs.get(jid)
+            if job is None:
+                return
+            if fields.get("status") == "failed":
+                self.failed += 1
+            elif fields.get("status") == "timeout":
+                self.timeouts += 1
+            job.update(fields)
+            self._cond.notify_all()
+
+    def _trim(self) -> None:
+        # Drop the oldest finished jobs beyond keep (called with the lock held)
+        extra = len(self._jobs) - self.keep
+        for jid in [j for j, job in self._jobs.items() if job["status"] not in ("pending", "running")][:max(extra, 0)]:
+            del self._jobs[jid]
+
+    def _view(self, job) -> dict:
+        out = {k: job[k] for k in ("id", "status", "narrative", "error", "cached", "elapsed_ms")}
+        if job["status"] == "running" and time.time() - job["started"] > self.timeout:
+            out.update(status="timeout", error=f"no answer within {self.timeout:g}s")
+        return out
+
+    def get(self, jid: str):
+        """
+        Current state of a job ({id, status, narrative, error, cached, elapsed_ms}), or None if unknown.
+        Jobs another worker finished are found in the shared cache.
+        """
+        with self._cond:
+            job = self._jobs.get(jid)
+            if job is not None:
+                return self._view(job)
+        job = self._cached(jid)
+        return self._view(job) if job is not None else None
+
+    def wait(self, jid: str, timeout: float = None):
+        """Like get, but blocks until the job has finished or timeout seconds (default: the call timeout) pass."""
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._cond:
+            while True:
+                job = self._jobs.get(jid)
+                if job is None or job["status"] not in ("pending", "running"):
+                    break
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                self._cond.wait(left)
+        if job is None:
+            job = self._cached(jid)
+        return self._view(job) if job is not None else None
+
+    def stats(self) -> dict:
+        with self._cond:
+            active = [j["status"] for j in self._jobs.values()]
+            return {
+                "model": self.model,
+                "pending": active.count("pending"),
+                "running": active.count("running"),
+                "kept": len(active),
+                "max_pending": self.max_pending,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "timeouts": self.timeouts,
+                "cache": self.cache.stats() if self.cache is not None else None,
+            }
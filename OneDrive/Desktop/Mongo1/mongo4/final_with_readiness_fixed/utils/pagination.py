@@ -0,0 +1,155 @@
+import base64
+import json
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class _Desc:
+    # Flips the comparison so descending keys can sit in an ascending tuple
+    __slots__ = ("v",)
+
+    def __init__(self, v):
+        self.v = v
+
+    def __lt__(self, other):
+        return other.v < self.v
+
+    def __eq__(self, other):
+        return self.v == other.v
+
+
+def _plain(value):
+    # Cursor values must survive a JSON round trip
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, (np.integer, np.floating)):
+        return value.item()
+    return value
+
+
+def page_size(raw, default: int = DEFAULT_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE) -> int:
+    """Clamp a user-supplied ?limit= to [1, maximum]."""
+    try:
+        return min(max(int(raw), 1), maximum)
+    except (TypeError, ValueError):
+        return default
+
+
+class SortedPages:
+    """
+    Precomputed sort permutation over one frame, paged with keyset cursors.
+    - by/ascending: the sort spec; numbers sort numerically, everything else as text.
+    - Personnel_ID is always the final tie-break, so every row has a unique position.
+    - A cursor stores the boundary row's sort values and ID rather than an offset,
+      so it stays meaningful after the dataset is reloaded or rows are added.
+    Building costs one sort; each page is a binary search plus O(limit).
+    """
+
+    def __init__(self, df: pd.DataFrame, by, ascending=True, id_col: str = "Personnel_ID"):
+        self.by = [by] if isinstance(by, str) else list(by)
+        self.ascending = [ascending] * len(self.by) if isinstance(ascending, bool) else list(ascending)
+        self.id_col = id_col
+
+        self._values = []
+        lex = []
+        for col, asc in zip(self.by, self.ascending):
+            s = df[col]
+            if s.dtype.kind in "biuf":
+                values = s.to_numpy(dtype=float, na_value=np.nan)
+                key = values.copy()
+            else:
+                values = s.astype(object).where(s.notna(), None).to_numpy()
+                codes, _ = pd.factorize(values, sort=True)
+                key = codes.astype(float)
+                key[codes < 0] = np.nan
+            key = key if asc else -key
+            missing = np.isnan(key)
+            self._values.append(values)
+            lex.append((missing, np.where(missing, 0, key)))
+        ids = df[id_col].astype(str).to_numpy()
+        id_codes, _ = pd.factorize(ids, sort=True)
+
+        # np.lexsort: last key is primary; each column sorts missing values last
+        keys = [id_codes]
+        for missing, key in reversed(lex):
+            keys += [key, missing]
+        self.permutation = np.lexsort(keys)
+        self._values = [v[self.permutation] for v in self._values]
+        self._ids = ids[self.permutation]
+        self.labels = df.index.to_numpy()[self.permutation]
+
+    def __len__(self):
+        return len(self.permutation)
+
+    def _part(self, v, asc):
+        if v is None or (isinstance(v, float) and np.isnan(v)):
+            return (1, 0)
+        return (0, v if asc else _Desc(v))
+
+    def _key(self, values, row_id):
+        return tuple(self._part(v, asc) for v, asc in zip(values, self.ascending)) + (row_id,)
+
+    def _row_key(self, i):
+        return self._key([v[i] for v in self._values], self._ids[i])
+
+    def _search(self, key, side):
+        # Binary search over the sorted rows, building composite keys only for probed rows
+        find = bisect_right if side == "right" else bisect_left
+        return find(range(len(self)), key, key=self._row_key)
+
+    def encode(self, i) -> str:
+        payload = {"v": [_plain(v[i]) for v in self._values], "id": str(self._ids[i])}
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+    def decode(self, token: str):
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            payload = json.loads(raw)
+            values, row_id = payload["v"], str(payload["id"])
+        except Exception:
+            raise InvalidCursor("Malformed page cursor.")
+        if not isinstance(values, list) or len(values) != len(self.by):
+            raise InvalidCursor("Page cursor does not match this sort order.")
+        return self._key(values, row_id)
+
+    def bound(self, upper) -> int:
+        """Number of leading rows whose first sort value comes before upper."""
+        asc = self.ascending[0]
+        return bisect_left(range(len(self)), self._part(upper, asc),
+                           key=lambda i: self._part(self._values[0][i], asc))
+
+    def page(self, after: str = None, before: str = None, limit: int = DEFAULT_PAGE_SIZE, stop: int = None) -> dict:
+        """
+        One page of index labels plus cursors for its neighbours.
+        - after/before: cursor tokens from a previous page (after wins if both are given).
+        - stop: only rows before this position are in play (see bound()).
+        """
+        stop = len(self) if stop is None else stop
+        try:
+            if after:
+                start = min(self._search(self.decode(after), "right"), stop)
+                end = min(start + limit, stop)
+            elif before:
+                end = min(self._search(self.decode(before), "left"), stop)
+                start = max(end - limit, 0)
+            else:
+                start, end = 0, min(limit, stop)
+        except TypeError:
+            # e.g. a text value in a cursor for a numeric sort
+            raise InvalidCursor("Page cursor does not match this sort order.")
+        return {
+            "index": self.labels[start:end],
+            "next": self.encode(end - 1) if end < stop and end > start else None,
+            "prev": self.encode(start) if start > 0 else None,
+            "start": start,
+            "total": stop,
+        }
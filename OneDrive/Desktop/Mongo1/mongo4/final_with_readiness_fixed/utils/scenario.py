@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+from utils.indexes import Bitmap, all_rows, in_category, in_range
+from utils.ranking import take
+
+
+def _with_patch(s: pd.Series, at, values) -> pd.Series:
+    # Writable copy of s with s.iloc[at] = values, widening categoricals as needed
+    out = s.copy()
+    if isinstance(out.dtype, pd.CategoricalDtype):
+        new = [v for v in pd.unique(values) if v not in out.cat.categories]
+        if new:
+            out = out.cat.add_categories(new)
+    elif out.dtype.kind in "biuf":
+        values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy()
+    out.iloc[at] = values
+    return out
+
+
+class Scenario:
+    """
+    Copy-on-write what-if view over an immutable base frame (normally the derived DF).
+    - steps: the mask stack, one {label, removed, changed} entry per step (Bitmaps; None if n/a).
+    - keep: Bitmap of rows still on the roster (AND of every step's complement).
+    - patches: {column: (sorted positions, values)} overriding base cells; later steps win.
+    Each step costs one n/8-byte bitmap plus its patched cells, however many are stacked;
+    frames are only materialized for the rows a caller asks for (take).
+    """
+
+    def __init__(self, base: pd.DataFrame, keep: Bitmap = None, patches=None, steps=()):
+        self.base = base
+        self.keep = keep if keep is not None else all_rows(base)
+        self.patches = patches or {}
+        self.steps = steps
+
+    def __len__(self):
+        return self.keep.count()
+
+    # --- composing -------------------------------------------------------
+
+    def drop(self, rows: Bitmap, label: str) -> "Scenario":
+        """Take rows off the roster (retired, grounded, transferred out)."""
+        removed = self.keep & rows
+        return Scenario(self.base, self.keep & ~rows, self.patches,
+                        self.steps + ({"label": label, "removed": removed, "changed": None},))
+
+    def assign(self, rows: Bitmap, label: str, **columns) -> "Scenario":
+        """
+        Overwrite columns for the rows still on the roster.
+        Each value is a scalar, or a callable getting the current values and returning new ones.
+        """
+        pos = (self.keep & rows).positions()
+        patches = dict(self.patches)
+        for col, value in columns.items():
+            new = value(self.column(col).to_numpy()[pos]) if callable(value) else [value] * len(pos)
+            new = np.asarray(new, dtype=object)
+            if col in patches:
+                # Merge with the earlier patch, keeping the newest value per position
+                old_pos, old_vals = patches[col]
+                all_pos = np.concatenate([pos, old_pos])
+                all_vals = np.concatenate([new, old_vals])
+                pos_u, first = np.unique(all_pos, return_index=True)
+                patches[col] = (pos_u, all_vals[first])
+            else:
+                patches[col] = (pos, new)
+        return Scenario(self.base, self.keep, patches,
+                        self.steps + ({"label": label, "removed": None, "changed": Bitmap.from_positions(pos, self.keep.size)},))
+
+    # --- reading through -------------------------------------------------
+
+    def column(self, col: str) -> pd.Series:
+        """Full-length base column with this scenario's patches (the base Series itself if unpatched)."""
+        s = self.base[col]
+        if col not in self.patches:
+            return s
+        pos, values = self.patches[col]
+        return _with_patch(s, pos, values)
+
+    def in_category(self, col: str, values=None, contains: str = None) -> Bitmap:
+        """in_category over the rows still present, seeing patched values."""
+        hits = in_category(self.base, col, values, contains)
+        if col in self.patches:
+            pos, vals = self.patches[col]
+            mask = hits.mask()
+            mask[pos] = in_category(pd.DataFrame({col: pd.Series(vals, dtype=object)}), col, values, contains).mask()
+            hits = Bitmap.from_mask(mask)
+        return hits & self.keep
+
+    def in_range(self, col: str, lo=None, hi=None, lo_inclusive: bool = True, hi_inclusive: bool = False) -> Bitmap:
+        """in_range over the rows still present, seeing patched values."""
+        hits = in_range(self.base, col, lo, hi, lo_inclusive, hi_inclusive)
+        if col in self.patches:
+            pos, vals = self.patches[col]
+            mask = hits.mask()
+            patched = pd.DataFrame({col: pd.to_numeric(pd.Series(vals), errors="coerce")})
+            mask[pos] = in_range(patched, col, lo, hi, lo_inclusive, hi_inclusive).mask()
+            hits = Bitmap.from_mask(mask)
+        return hits & self.keep
+
+    def positions(self) -> np.ndarray:
+        return self.keep.positions()
+
+    def take(self, positions, columns) -> pd.DataFrame:
+        """Rows at base positions, projected to columns, with patches applied."""
+        out = take(self.base, positions, columns)
+        for col in list(out.columns):
+            if col in self.patches and len(self.patches[col][0]):
+                pos, vals = self.patches[col]
+                at = np.searchsorted(pos, positions)
+                hit = (at < len(pos)) & (pos[np.minimum(at, len(pos) - 1)] == positions)
+                if hit.any():
+                    out = out.assign(**{col: _with_patch(out[col], np.flatnonzero(hit), vals[at[hit]])})
+        return out
+
+    def value_counts(self, col: str) -> dict:
+        s = self.column(col)[self.keep.mask()]
+        counts = s.value_counts()
+        return {str(k): int(v) for k, v in counts.items() if v > 0}
+
+    def describe_steps(self) -> list:
+        return [{"label": s["label"],
+                 "removed": s["removed"].count() if s["removed"] is not None else 0,
+                 "changed": s["changed"].count() if s["changed"] is not None else 0} for s in self.steps]